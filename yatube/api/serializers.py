@@ -0,0 +1,66 @@
+from posts.rendering import url_for
+
+
+def _thumbnail(post):
+    if not post.thumbnail:
+        return None
+    return {
+        'url': post.thumbnail.url,
+        'width': post.thumbnail_width,
+        'height': post.thumbnail_height,
+    }
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'updated': lambda post: post.updated.isoformat(),
+    'author': lambda post: post.author.username,
+    'author_name': lambda post: post.author.get_full_name(),
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'thumbnail': _thumbnail,
+    'comment_count': lambda post: post.comment_count,
+    'url': lambda post: url_for('posts:post_detail', post.pk),
+}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'post': lambda comment: comment.post_id,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created.isoformat(),
+}
+
+
+def parse_fields(value, available):
+    """
+    Список полей из параметра ?fields=a,b. Без параметра — все поля.
+    Неизвестное поле — ValueError с его именем.
+    """
+    if not value:
+        return list(available)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(', '.join(unknown))
+    return fields
+
+
+def serialize(obj, fields, available):
+    return {field: available[field](obj) for field in fields}
+
+
+def serialize_author(author, following):
+    # У пользователя, созданного в обход сигналов, UserStats может ещё
+    # не быть (его создаёт manage.py reconcile_counters).
+    stats = getattr(author, 'stats', None)
+    return {
+        'username': author.username,
+        'name': author.get_full_name(),
+        'post_count': getattr(stats, 'post_count', 0),
+        'follower_count': getattr(stats, 'follower_count', 0),
+        'following_count': getattr(stats, 'following_count', 0),
+        'following': following,
+    }
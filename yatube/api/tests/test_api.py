@@ -0,0 +1,218 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import follows
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            ) for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds(self):
+        """Ленты отдают посты в том же порядке, что и HTML-страницы."""
+        expected = [post.pk for post in reversed(self.posts)]
+        urls = (
+            reverse('api:posts'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']], expected
+                )
+                self.assertEqual(data['results'][0]['author'], 'author')
+
+    def test_cursor_pagination(self):
+        """Курсор next ведёт на следующую страницу без повторов."""
+        url = reverse('api:posts')
+        first = self.guest_client.get(url, {'limit': 2}).json()
+        second = self.guest_client.get(
+            url, {'limit': 2, 'cursor': first['next']}
+        ).json()
+        self.assertEqual(len(first['results']), 2)
+        self.assertEqual(
+            [post['id'] for post in second['results']], [self.posts[0].pk]
+        )
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только запрошенные поля."""
+        url = reverse('api:post_detail', args=[self.posts[0].pk])
+        response = self.guest_client.get(url, {'fields': 'id,text'})
+        self.assertEqual(
+            response.json(), {'id': self.posts[0].pk, 'text': 'Пост 0'}
+        )
+        response = self.guest_client.get(url, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(API_BATCH_SIZE=3)
+    def test_batch(self):
+        """?ids= отдаёт посты в порядке запроса за один запрос."""
+        url = reverse('api:posts')
+        ids = f'{self.posts[2].pk},999,{self.posts[0].pk}'
+        with self.assertNumQueries(1):
+            data = self.guest_client.get(url, {'ids': ids}).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.posts[2].pk, self.posts[0].pk]
+        )
+        self.assertEqual(data['missing'], [999])
+        for ids in ('1,x', '1,2,3,4'):
+            with self.subTest(ids=ids):
+                response = self.guest_client.get(url, {'ids': ids})
+                self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get(self):
+        """Ленты API поддерживают ETag, как HTML-страницы."""
+        url = reverse('api:posts')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_profile_counters_change_etag(self):
+        """Чужая подписка меняет ETag профиля со счётчиками автора."""
+        url = reverse('api:profile', args=[self.author.username])
+        etag = self.guest_client.get(url)['ETag']
+        follows.follow(self.reader, [self.author.pk])
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author']['follower_count'], 1)
+        etag = response['ETag']
+        follows.unfollow(self.reader, [self.author.pk])
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['author']['follower_count'], 0)
+
+    def test_profile_without_stats(self):
+        """Профиль без UserStats отдаётся с нулевыми счётчиками."""
+        UserStats.objects.filter(user=self.author).delete()
+        response = self.guest_client.get(
+            reverse('api:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author']['post_count'], 0)
+
+    def test_comments(self):
+        """Комментарий создаётся из JSON, список листается курсором."""
+        url = reverse('api:comments', args=[self.posts[0].pk])
+        response = self.guest_client.post(
+            url, json.dumps({'text': 'Гость'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+        for number in range(3):
+            response = self.reader_client.post(
+                url, json.dumps({'text': f'Комментарий {number}'}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        response = self.reader_client.post(
+            url, json.dumps({'text': ''}), content_type='application/json'
+        )
+        self.assertIn('text', response.json()['errors'])
+        first = self.guest_client.get(url, {'limit': 2}).json()
+        second = self.guest_client.get(
+            url, {'limit': 2, 'cursor': first['next']}
+        ).json()
+        texts = [comment['text'] for comment in
+                 first['results'] + second['results']]
+        self.assertEqual(
+            texts, ['Комментарий 2', 'Комментарий 1', 'Комментарий 0']
+        )
+        self.assertEqual(Comment.objects.count(), 3)
+        response = self.guest_client.get(url, {'cursor': 'bad'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_follow(self):
+        """Подписка и отписка через API меняют ленту подписок."""
+        url = reverse('api:follow', args=[self.author.username])
+        self.assertEqual(self.guest_client.post(url).status_code, 401)
+        self.assertEqual(self.reader_client.post(url).status_code, 201)
+        self.assertEqual(self.reader_client.post(url).status_code, 200)
+        feed = self.reader_client.get(reverse('api:follow_index')).json()
+        self.assertEqual(len(feed['results']), 3)
+        profile = self.reader_client.get(
+            reverse('api:profile', args=[self.author.username])
+        ).json()
+        self.assertTrue(profile['author']['following'])
+        self.assertEqual(profile['author']['follower_count'], 1)
+        self.assertEqual(self.reader_client.delete(url).status_code, 200)
+        self.assertFalse(Follow.objects.exists())
+        own = reverse('api:follow', args=[self.reader.username])
+        self.assertEqual(self.reader_client.post(own).status_code, 400)
+
+    def test_follow_many(self):
+        """Пакетная подписка сообщает новых авторов и ненайденные имена."""
+        url = reverse('api:follow_index')
+        authors = ['author', 'nobody', 'reader']
+        response = self.reader_client.post(
+            url, json.dumps({'authors': authors}),
+            content_type='application/json'
+        )
+        self.assertEqual(
+            response.json(), {'followed': ['author'], 'missing': ['nobody']}
+        )
+        response = self.reader_client.post(
+            url, json.dumps({'authors': authors}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['followed'], [])
+        self.assertEqual(Follow.objects.count(), 1)
+        response = self.reader_client.post(
+            url, json.dumps({'authors': 'author'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_csrf(self):
+        """Изменяющие запросы требуют CSRF-токен, отказ приходит в JSON."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        url = reverse('api:follow', args=[self.author.username])
+        response = client.post(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF', response.json()['error'])
+        self.assertFalse(Follow.objects.exists())
+        token = client.get(reverse('api:csrf')).json()['csrf_token']
+        response = client.post(url, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 201)
+        response = client.delete(url, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_errors(self):
+        """Ошибки отдаются в JSON."""
+        cases = (
+            (self.guest_client.get(reverse('api:post_detail', args=[999])),
+             404),
+            (self.guest_client.get(reverse('api:follow_index')), 401),
+            (self.guest_client.post(reverse('api:posts')), 405),
+        )
+        for response, status in cases:
+            with self.subTest(status=status):
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', response.json())
@@ -0,0 +1,294 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware, get_token
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+
+from posts import comment_queue, follows, versions
+from posts.comments import comment_page, newer_comments
+from posts.decorators import feed_conditional, follow_feeds, profile_feeds
+from posts.feeds import follow_feed, followed_celebrities
+from posts.following import is_following
+from posts.forms import CommentForm
+from posts.models import Group, Post, User
+from posts.utils import CursorPaginator
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, parse_fields,
+                          serialize, serialize_author)
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _error(status, message):
+    return JsonResponse({'error': message}, status=status)
+
+
+class _CsrfCheck(CsrfViewMiddleware):
+    """Проверка CSRF из CsrfViewMiddleware с отказом в виде JSON."""
+
+    def _reject(self, request, reason):
+        return _error(403, f'Проверка CSRF не пройдена: {reason}')
+
+
+def api_view(methods, login=False):
+    """
+    Обёртка JSON-эндпоинта: допустимые методы, вход для login=True и
+    ошибки в виде {"error": ...} вместо HTML-страниц.
+
+    Изменяющие запросы проходят обычную проверку CSRF: сессионный
+    клиент берёт токен из GET /api/csrf/ и присылает его в заголовке
+    X-CSRFToken. Отказ тоже приходит в JSON.
+    """
+    allowed = list(methods) + (['HEAD'] if 'GET' in methods else [])
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = _error(405, 'Метод не поддерживается')
+                response['Allow'] = ', '.join(allowed)
+                return response
+            if login and not request.user.is_authenticated:
+                return _error(401, 'Требуется вход')
+            rejected = _CsrfCheck().process_view(request, None, (), {})
+            if rejected is not None:
+                return rejected
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return _error(404, 'Не найдено')
+            except ApiError as error:
+                return _error(error.status, error.message)
+        return csrf_exempt(wrapper)
+    return decorator
+
+
+def _fields(request, available):
+    try:
+        return parse_fields(request.GET.get('fields'), available)
+    except ValueError as error:
+        raise ApiError(400, f'Неизвестные поля: {error}')
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом')
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def _data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, 'Некорректный JSON')
+        if not isinstance(data, dict):
+            raise ApiError(400, 'Ожидается JSON-объект')
+        return data
+    return request.POST
+
+
+def _feed(request, posts, **extra):
+    fields = _fields(request, POST_FIELDS)
+    paginator = CursorPaginator(posts, _limit(request))
+    page = paginator.cursor_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize(post, fields, POST_FIELDS) for post in page],
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+        **extra,
+    })
+
+
+def _batch(request):
+    """Посты по списку ?ids=1,2,3 в порядке списка."""
+    try:
+        ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+    except ValueError:
+        raise ApiError(400, 'ids — список чисел через запятую')
+    if len(ids) > settings.API_BATCH_SIZE:
+        raise ApiError(
+            400, f'Не больше {settings.API_BATCH_SIZE} ids за запрос'
+        )
+    fields = _fields(request, POST_FIELDS)
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return JsonResponse({
+        'results': [
+            serialize(posts[pk], fields, POST_FIELDS)
+            for pk in ids if pk in posts
+        ],
+        'missing': [pk for pk in ids if pk not in posts],
+    })
+
+
+def _index_feeds(request):
+    if 'ids' in request.GET:
+        return None
+    return [versions.global_feed()]
+
+
+@api_view(['GET'])
+@feed_conditional(_index_feeds)
+def posts(request):
+    if 'ids' in request.GET:
+        return _batch(request)
+    return _feed(request, Post.objects.for_feed())
+
+
+@api_view(['GET'])
+@feed_conditional(lambda request, slug: [versions.group_feed(slug)])
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _feed(request, group.group_posts.for_feed(), group={
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    })
+
+
+@api_view(['GET'])
+@feed_conditional(profile_feeds, viewer=True)
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    following = is_following(request.user, author.pk)
+    return _feed(
+        request, author.posts.for_feed(),
+        author=serialize_author(author, following),
+    )
+
+
+@api_view(['GET'])
+@feed_conditional(
+    lambda request, post_id: [versions.post_feed(post_id)]
+)
+def post_detail(request, post_id):
+    fields = _fields(request, POST_FIELDS)
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    return JsonResponse(serialize(post, fields, POST_FIELDS))
+
+
+def _comment_page(request, post):
+    """
+    Комментарии от новых к старым с курсором next, а с ?after=<id> —
+    только появившиеся после комментария id, от старых к новым.
+    """
+    fields = _fields(request, COMMENT_FIELDS)
+    limit = _limit(request)
+    if 'after' in request.GET:
+        try:
+            after = int(request.GET['after'])
+        except ValueError:
+            raise ApiError(400, 'after должен быть числом')
+        page, next_cursor = newer_comments(post.pk, after, limit), None
+    else:
+        try:
+            page, next_cursor = comment_page(
+                post, request.GET.get('cursor'), limit
+            )
+        except ValueError:
+            raise ApiError(400, 'Некорректный курсор')
+    return JsonResponse({
+        'results': [
+            serialize(comment, fields, COMMENT_FIELDS) for comment in page
+        ],
+        'next': next_cursor,
+    })
+
+
+@transaction.atomic
+def _create_comment(request, post):
+    form = CommentForm(_data(request))
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    if settings.COMMENT_QUEUE:
+        pending = comment_queue.enqueue(
+            post.pk, request.user, form.cleaned_data['text']
+        )
+        data = serialize(pending, list(COMMENT_FIELDS), COMMENT_FIELDS)
+        data['id'] = None
+        return JsonResponse({**data, 'pending': True}, status=202)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return JsonResponse(
+        serialize(comment, list(COMMENT_FIELDS), COMMENT_FIELDS), status=201
+    )
+
+
+@api_view(['GET', 'POST'])
+def comments(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    if request.method == 'GET':
+        return _comment_page(request, post)
+    if not request.user.is_authenticated:
+        return _error(401, 'Требуется вход')
+    return _create_comment(request, post)
+
+
+def _follow_many(request):
+    """
+    Пакетная подписка: {"authors": ["имя", ...]} одним INSERT.
+    В ответе — на кого подписка появилась и какие имена не найдены.
+    """
+    data = _data(request)
+    usernames = data.getlist('authors') if hasattr(
+        data, 'getlist'
+    ) else data.get('authors')
+    if not isinstance(usernames, list) or not all(
+        isinstance(username, str) for username in usernames
+    ):
+        raise ApiError(400, 'authors — список имён пользователей')
+    if len(usernames) > settings.API_BATCH_SIZE:
+        raise ApiError(
+            400, f'Не больше {settings.API_BATCH_SIZE} авторов за запрос'
+        )
+    authors = dict(User.objects.filter(
+        username__in=usernames
+    ).values_list('pk', 'username'))
+    added = follows.follow(request.user, list(authors))
+    found = set(authors.values())
+    return JsonResponse({
+        'followed': [authors[pk] for pk in added],
+        'missing': [name for name in usernames if name not in found],
+    })
+
+
+@api_view(['GET', 'POST'], login=True)
+@feed_conditional(follow_feeds)
+def follow_index(request):
+    if request.method == 'POST':
+        return _follow_many(request)
+    celebrities = list(followed_celebrities(request.user))
+    return _feed(request, follow_feed(request.user, celebrities))
+
+
+@api_view(['POST', 'DELETE'], login=True)
+def follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.method == 'DELETE':
+        follows.unfollow(request.user, [author.pk])
+        return JsonResponse({'following': False})
+    if author == request.user:
+        raise ApiError(400, 'Нельзя подписаться на себя')
+    added = follows.follow(request.user, [author.pk])
+    return JsonResponse({'following': True}, status=201 if added else 200)
+
+
+@api_view(['GET'])
+def csrf(request):
+    """CSRF-токен для изменяющих запросов сессионного клиента."""
+    return JsonResponse({'csrf_token': get_token(request)})
@@ -0,0 +1,15 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite, в котором transaction.atomic сразу берёт блокировку записи.
+
+    Обычный BEGIN откладывает её до первой записи, и если к этому
+    моменту пишет другой процесс, SQLite возвращает «database is locked»
+    без ожидания busy_timeout. BEGIN IMMEDIATE ждёт очереди с самого
+    начала транзакции.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,368 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+LOCK_SUFFIX = ':lock'
+LOCK_TIMEOUT = 10
+LOCK_POLL = 0.05
+TOUCH_RESOLUTION = 1.0
+
+
+class SharedCache(BaseCache):
+    """
+    Общая часть кэшей проекта: счётчики попаданий и промахов (в том
+    числе в core.metrics) и get_or_set, защищённый от «эффекта толпы»:
+    значение вычисляет только тот процесс, который первым взял
+    блокировку.
+    """
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _record(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+        metrics.record_cache(hits, misses)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, version=version)
+        if value is not None:
+            return value
+        lock = key + LOCK_SUFFIX
+        if not self.add(lock, 1, LOCK_TIMEOUT, version=version):
+            deadline = time.time() + LOCK_TIMEOUT
+            while time.time() < deadline:
+                time.sleep(LOCK_POLL)
+                value = self.get(key, version=version)
+                if value is not None:
+                    return value
+        try:
+            if callable(default):
+                default = default()
+            if default is not None:
+                self.set(key, default, timeout, version=version)
+        finally:
+            self.delete(lock, version=version)
+        return default
+
+
+class SQLiteCache(SharedCache):
+    """
+    Общий для всех процессов кэш в файле SQLite.
+
+    Записи вытесняются по давности последнего обращения (LRU), когда их
+    становится больше MAX_ENTRIES.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL, accessed REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_accessed '
+                'ON cache (accessed)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _fetch(self, keys):
+        now = time.time()
+        placeholders = ','.join('?' * len(keys))
+        rows = self._connection().execute(
+            f'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})', keys
+        ).fetchall()
+        found, stale = {}, []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > TOUCH_RESOLUTION:
+                stale.append(key)
+        if stale:
+            self._connection().execute(
+                f'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({",".join("?" * len(stale))})',
+                [now, *stale]
+            )
+        return found
+
+    def _cull(self, connection):
+        total = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if total <= self._max_entries:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),)
+        )
+        total = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        excess = total - self._max_entries
+        if excess > 0:
+            excess += self._max_entries // self._cull_frequency
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (excess,)
+            )
+
+    def _write(self, rows, timeout, only_new=False):
+        connection = self._connection()
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, now)
+            for key, value in rows
+        ]
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if only_new:
+                connection.executemany(
+                    'DELETE FROM cache WHERE key = ? '
+                    'AND expires IS NOT NULL AND expires <= ?',
+                    [(row[0], now) for row in rows]
+                )
+                cursor = connection.executemany(
+                    'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)', rows
+                )
+            else:
+                cursor = connection.executemany(
+                    'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows
+                )
+            self._cull(connection)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return cursor.rowcount > 0
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._fetch([key])
+        self._record(int(key in found), int(key not in found))
+        return found.get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        mapping = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(mapping))
+        self._record(len(found), len(mapping) - len(found))
+        return {mapping[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write([(self._key(key, version), value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if data:
+            self._write([
+                (self._key(key, version), value)
+                for key, value in data.items()
+            ], timeout)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(
+            [(self._key(key, version), value)], timeout, only_new=True
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ?', (
+                self.get_backend_timeout(timeout), time.time(),
+                self._key(key, version)
+            )
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            found = self._fetch([key])
+            if key not in found:
+                raise ValueError(f"Key '{key}' not found")
+            value = found[key] + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key)
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return value
+
+    def delete(self, key, version=None):
+        self._connection().execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def has_key(self, key, version=None):
+        return bool(self._fetch([self._key(key, version)]))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def stats(self):
+        entries = self._connection().execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+
+# INCRBY только для существующего ключа: версия ленты, вытесненная из
+# кэша, не должна начаться заново с delta (см. posts.versions).
+INCR_EXISTING = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+CLEAR_BATCH = 1000
+
+
+class RedisCache(SharedCache):
+    """
+    Кэш в Redis (LOCATION — redis://...), клиент redis-py.
+
+    Целые числа хранятся как есть, чтобы incr был атомарным INCRBY,
+    остальное — pickle. LRU обеспечивает сам Redis: с OPTIONS MAXMEMORY
+    кэш задаёт предел памяти и политику allkeys-lru. clear() удаляет
+    только ключи этого кэша (по KEY_PREFIX), а не всю базу.
+    """
+
+    def __init__(self, location, params):
+        import redis
+        super().__init__(params)
+        self._client = redis.Redis.from_url(location)
+        self._incr = self._client.register_script(INCR_EXISTING)
+        maxmemory = params.get('OPTIONS', {}).get('MAXMEMORY')
+        if maxmemory:
+            self._client.config_set('maxmemory', maxmemory)
+            self._client.config_set('maxmemory-policy', 'allkeys-lru')
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _milliseconds(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else int(timeout * 1000)
+
+    def _write(self, pipeline, key, value, timeout, only_new=False):
+        milliseconds = self._milliseconds(timeout)
+        if milliseconds is not None and milliseconds <= 0:
+            return pipeline.delete(key)
+        return pipeline.set(
+            key, self._encode(value), px=milliseconds, nx=only_new
+        )
+
+    def get(self, key, default=None, version=None):
+        value = self._client.get(self._key(key, version))
+        self._record(int(value is not None), int(value is None))
+        return default if value is None else self._decode(value)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        mapping = {self._key(key, version): key for key in keys}
+        values = self._client.mget(list(mapping))
+        found = {
+            mapping[key]: self._decode(value)
+            for key, value in zip(mapping, values) if value is not None
+        }
+        self._record(len(found), len(mapping) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(self._client, self._key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if data:
+            pipeline = self._client.pipeline()
+            for key, value in data.items():
+                self._write(pipeline, self._key(key, version), value, timeout)
+            pipeline.execute()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(self._write(
+            self._client, self._key(key, version), value, timeout,
+            only_new=True
+        ))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        milliseconds = self._milliseconds(timeout)
+        if milliseconds is None:
+            return bool(self._client.persist(key)) or self.has_key(key)
+        return bool(self._client.pexpire(key, milliseconds))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        value = self._incr(keys=[key], args=[delta])
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def delete(self, key, version=None):
+        self._client.delete(self._key(key, version))
+
+    def has_key(self, key, version=None):
+        return bool(self._client.exists(self._key(key, version)))
+
+    def clear(self):
+        batch = []
+        for key in self._client.scan_iter(
+            match=f'{self.key_prefix}:*', count=CLEAR_BATCH
+        ):
+            batch.append(key)
+            if len(batch) == CLEAR_BATCH:
+                self._client.delete(*batch)
+                batch = []
+        if batch:
+            self._client.delete(*batch)
+
+    def stats(self):
+        # Ключи всей базы Redis: подсчёт по префиксу обходил бы её целиком.
+        entries = self._client.dbsize()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
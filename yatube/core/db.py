@@ -0,0 +1,124 @@
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+POSITION_PREFIX = 'replica_position:'
+
+_state = threading.local()
+
+
+def pinned():
+    return getattr(_state, 'depth', 0) > 0
+
+
+def mark_replicated(aliases, position):
+    """
+    Запоминает в общем кэше, что реплики содержат все коммиты основной
+    базы, сделанные до момента position (timestamp начала копирования).
+    """
+    cache.set_many(
+        {POSITION_PREFIX + alias: position for alias in aliases}, None
+    )
+
+
+@contextmanager
+def read_after(timestamp):
+    """
+    Читает только из реплик, скопированных не раньше timestamp, а если
+    таких нет — из основной базы. Страница, собранная по версии ленты,
+    изменённой в timestamp, не попадёт в кэш с данными отстающей реплики.
+    """
+    previous = getattr(_state, 'replicas', None)
+    replicas = settings.DATABASE_REPLICAS
+    if replicas and not pinned():
+        positions = cache.get_many(
+            [POSITION_PREFIX + alias for alias in replicas]
+        )
+        _state.replicas = [
+            alias for alias in replicas
+            if positions.get(POSITION_PREFIX + alias, 0) >= timestamp
+        ]
+    try:
+        yield
+    finally:
+        _state.replicas = previous
+
+
+@contextmanager
+def use_primary():
+    """Направляет все чтения текущего потока в основную базу."""
+    _state.depth = getattr(_state, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+
+
+class PrimaryReplicaRouter:
+    """
+    Пишет в основную базу, читает из случайной реплики.
+
+    Внутри use_primary (запросы, изменяющие данные, и несколько секунд
+    после них для того же браузера) чтения тоже идут в основную базу,
+    чтобы пользователь сразу видел собственные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(_state, 'replicas', None)
+        if replicas is None:
+            replicas = settings.DATABASE_REPLICAS
+        if not replicas or pinned():
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def supports_returning(connection):
+    """INSERT/DELETE ... RETURNING: PostgreSQL и SQLite с 3.35."""
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and (
+        connection.Database.sqlite_version_info >= (3, 35)
+    )
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Выполняет SQLITE_PRAGMAS на только что открытом соединении."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def replicate(source, targets):
+    """
+    Копирует файл SQLite целиком в каждую реплику через backup API.
+
+    Локальная замена потоковой репликации: копия согласована на момент
+    начала копирования, а читатели реплики не блокируются дольше одной
+    страницы.
+    """
+    primary = sqlite3.connect(source)
+    try:
+        for target in targets:
+            replica = sqlite3.connect(target)
+            try:
+                primary.backup(replica, pages=256)
+            finally:
+                replica.close()
+    finally:
+        primary.close()
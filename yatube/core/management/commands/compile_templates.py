@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateSyntaxError
+
+from core.templates import build_bundle, django_engines
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны и собирает их исходники в один пакет '
+        'для core.templates.BundleLoader'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.TEMPLATE_BUNDLE,
+            help='Файл пакета (по умолчанию TEMPLATE_BUNDLE)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            names = build_bundle(django_engines()[0], options['output'])
+        except TemplateSyntaxError as error:
+            raise CommandError(f'Ошибка в шаблоне: {error}')
+        self.stdout.write(
+            f'Шаблонов в пакете: {len(names)} -> {options["output"]} '
+            f'({(time.perf_counter() - started) * 1000:.1f} ms)'
+        )
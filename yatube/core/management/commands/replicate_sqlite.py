@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import PRIMARY, mark_replicated, replicate
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование каждые N секунд'
+        )
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES[PRIMARY]['NAME']
+        targets = [
+            settings.DATABASES[alias]['NAME']
+            for alias in settings.DATABASE_REPLICAS
+        ]
+        if not targets:
+            self.stdout.write('Реплики не настроены (DB_REPLICAS)')
+            return
+        while True:
+            started = time.time()
+            replicate(source, targets)
+            mark_replicated(settings.DATABASE_REPLICAS, started)
+            self.stdout.write(f'Скопировано в реплик: {len(targets)}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
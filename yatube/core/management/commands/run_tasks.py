@@ -0,0 +1,41 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.db import use_primary
+from core.tasks import drain, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Выполняет отложенные задачи из очереди core.tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Проверять очередь каждые N секунд'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Сколько задач выполнять параллельно'
+        )
+
+    def run(self, workers):
+        if workers == 1:
+            with use_primary():
+                return run_pending()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return sum(
+                count or 0 for count in pool.map(
+                    lambda _: drain(), range(workers)
+                )
+            )
+
+    def handle(self, *args, **options):
+        while True:
+            count = self.run(max(options['workers'], 1))
+            if count or not options['interval']:
+                self.stdout.write(f'Выполнено задач: {count}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,229 @@
+import bisect
+import fcntl
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+MAGIC = b'YTMETR01'
+NAME_SIZE = 96
+SLOTS = 128
+OVERFLOW = '<other>'
+
+# Границы корзин гистограмм, мс.
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+           float('inf'))
+SERIES = ('request', 'sql', 'template')
+COUNTERS = ('queries', 'cache_hits', 'cache_misses', 'errors')
+WINDOWS = 2
+
+# Раскладка слота в массиве double: для каждой серии накопительные
+# count, sum и корзины, затем счётчики, затем WINDOWS скользящих окон
+# (номер окна и корзины каждой серии).
+SERIES_SIZE = 2 + len(BUCKETS)
+WINDOW_SIZE = 1 + len(SERIES) * len(BUCKETS)
+COUNTERS_OFFSET = len(SERIES) * SERIES_SIZE
+WINDOWS_OFFSET = COUNTERS_OFFSET + len(COUNTERS)
+SLOT_SIZE = WINDOWS_OFFSET + WINDOWS * WINDOW_SIZE
+
+_state = threading.local()
+
+
+class Sample:
+    """Замеры одного запроса, собираемые по ходу его обработки."""
+
+    def __init__(self):
+        self.sql_ms = 0.0
+        self.queries = 0
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+
+
+def current():
+    return getattr(_state, 'sample', None)
+
+
+def activate(sample):
+    _state.sample = sample
+
+
+def record_cache(hits=0, misses=0):
+    sample = current()
+    if sample is not None:
+        sample.cache_hits += hits
+        sample.cache_misses += misses
+
+
+def record_template(duration_ms):
+    sample = current()
+    if sample is not None:
+        sample.template_ms += duration_ms
+
+
+class MetricsStore:
+    """
+    Гистограммы по именам адресов в файле, отображённом в память.
+
+    Все процессы-воркеры открывают один файл METRICS_FILE и пишут в
+    общие страницы под блокировкой flock, поэтому /metrics показывает
+    сумму по всем воркерам. Процентили считаются по двум последним
+    окнам длиной METRICS_WINDOW секунд.
+    """
+
+    def __init__(self, path, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._slots = {}
+        names_size = SLOTS * NAME_SIZE
+        size = len(MAGIC) + names_size + SLOTS * SLOT_SIZE * 8
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            if self._map[:len(MAGIC)] != MAGIC:
+                self._map[:] = bytes(size)
+                self._map[:len(MAGIC)] = MAGIC
+        self._names = memoryview(self._map)[
+            len(MAGIC):len(MAGIC) + names_size
+        ]
+        self._values = memoryview(self._map)[
+            len(MAGIC) + names_size:
+        ].cast('d')
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _name(self, slot):
+        raw = bytes(self._names[slot * NAME_SIZE:(slot + 1) * NAME_SIZE])
+        return raw.rstrip(b'\0').decode(errors='replace')
+
+    def _find(self, name):
+        encoded = name.encode()[:NAME_SIZE]
+        for slot in range(SLOTS):
+            start = slot * NAME_SIZE
+            stored = bytes(self._names[start:start + NAME_SIZE]).rstrip(b'\0')
+            if stored == encoded:
+                return slot
+            if not stored:
+                # Последний слот оставлен для всех не поместившихся имён.
+                if slot == SLOTS - 1 and name != OVERFLOW:
+                    break
+                self._names[start:start + len(encoded)] = encoded
+                return slot
+        return self._find(OVERFLOW)
+
+    def _slot(self, name):
+        """Номер слота для имени; вызывается под блокировкой."""
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = self._find(name)
+        return slot
+
+    def record(self, name, request_ms, sample, error=False):
+        durations = (request_ms, sample.sql_ms, sample.template_ms)
+        epoch = int(time.time() // self.window)
+        values = self._values
+        with self._locked():
+            base = self._slot(name) * SLOT_SIZE
+            window = base + WINDOWS_OFFSET + epoch % WINDOWS * WINDOW_SIZE
+            if values[window] != epoch:
+                values[window] = epoch
+                for offset in range(window + 1, window + WINDOW_SIZE):
+                    values[offset] = 0
+            for number, duration in enumerate(durations):
+                bucket = bisect.bisect_left(BUCKETS, duration)
+                offset = base + number * SERIES_SIZE
+                values[offset] += 1
+                values[offset + 1] += duration
+                values[offset + 2 + bucket] += 1
+                values[window + 1 + number * len(BUCKETS) + bucket] += 1
+            counters = base + COUNTERS_OFFSET
+            values[counters] += sample.queries
+            values[counters + 1] += sample.cache_hits
+            values[counters + 2] += sample.cache_misses
+            values[counters + 3] += bool(error)
+
+    def snapshot(self):
+        """Копия всех слотов: {имя: {серия: данные, счётчик: значение}}."""
+        epoch = int(time.time() // self.window)
+        result = {}
+        with self._locked():
+            for slot in range(SLOTS):
+                name = self._name(slot)
+                if not name:
+                    break
+                base = slot * SLOT_SIZE
+                data = self._values[base:base + SLOT_SIZE].tolist()
+                entry = {}
+                for number, series in enumerate(SERIES):
+                    offset = number * SERIES_SIZE
+                    recent = [0] * len(BUCKETS)
+                    for window in range(WINDOWS):
+                        start = WINDOWS_OFFSET + window * WINDOW_SIZE
+                        if epoch - data[start] >= WINDOWS:
+                            continue
+                        first = start + 1 + number * len(BUCKETS)
+                        for bucket in range(len(BUCKETS)):
+                            recent[bucket] += data[first + bucket]
+                    entry[series] = {
+                        'count': int(data[offset]),
+                        'sum_ms': data[offset + 1],
+                        'buckets': [
+                            int(value) for value in
+                            data[offset + 2:offset + 2 + len(BUCKETS)]
+                        ],
+                        'recent': [int(value) for value in recent],
+                    }
+                for number, counter in enumerate(COUNTERS):
+                    entry[counter] = int(data[COUNTERS_OFFSET + number])
+                result[name] = entry
+        return result
+
+
+def quantile(buckets, share):
+    """Процентиль по корзинам с линейной интерполяцией внутри корзины."""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = share * total
+    seen = 0
+    for number, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            lower = BUCKETS[number - 1] if number else 0
+            upper = BUCKETS[number]
+            if upper == float('inf'):
+                return lower
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return BUCKETS[-2]
+
+
+_stores = {}
+
+
+def get_store():
+    key = (settings.METRICS_FILE, settings.METRICS_WINDOW)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = MetricsStore(*key)
+    return store
@@ -0,0 +1,81 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .db import use_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReadYourWritesMiddleware:
+    """
+    Закрепляет чтения за основной базой для запросов, меняющих данные,
+    и на REPLICA_PIN_SECONDS после них: браузер получает куку со
+    временем последней записи.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _recently_wrote(self, request):
+        try:
+            wrote_at = float(
+                request.COOKIES.get(settings.REPLICA_PIN_COOKIE, '')
+            )
+        except ValueError:
+            return False
+        return time.time() - wrote_at < settings.REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        writes = request.method not in SAFE_METHODS
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        if writes or self._recently_wrote(request):
+            with use_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        if writes:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, str(time.time()),
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Замеряет долю METRICS_SAMPLE_RATE запросов: полное время, число и
+    время SQL-запросов, время рендеринга шаблонов и попадания в кэш.
+    Результат пишется в core.metrics по имени адреса (namespace:name).
+    Запросы вне выборки обходятся одним вызовом random().
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        sample = metrics.Sample()
+        metrics.activate(sample)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            metrics.activate(None)
+        match = getattr(request, 'resolver_match', None)
+        metrics.get_store().record(
+            match.view_name if match else '<unresolved>',
+            (time.perf_counter() - started) * 1000, sample,
+            error=response.status_code >= 500
+        )
+        return response
@@ -0,0 +1,23 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Отложенный вызов функции для core.tasks. run_at пуст у задач,
+    исчерпавших попытки: они остаются в таблице с текстом ошибки.
+    """
+    name = models.CharField(max_length=200)
+    args = models.TextField(default='[]')
+    key = models.CharField(max_length=200, null=True, unique=True)
+    run_at = models.DateTimeField(null=True, default=timezone.now)
+    locked_until = models.DateTimeField(null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['run_at'])]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,124 @@
+import json
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .db import use_primary
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TASKS_WORKERS, thread_name_prefix='tasks'
+        )
+    return _executor
+
+
+def enqueue(func, *args, key=None):
+    """
+    Откладывает func(*args) до коммита текущей транзакции.
+
+    Аргументы должны сериализоваться в JSON. Задача с key, уже
+    ждущей в очереди, не добавляется повторно. Режим задаёт TASKS_MODE:
+    immediate — вызвать сразу (ошибка пишется в лог и не ломает
+    запрос); thread — очередь в базе и пул потоков этого процесса;
+    worker — только очередь, её разбирает manage.py run_tasks.
+    """
+    if settings.TASKS_MODE == 'immediate':
+        try:
+            with transaction.atomic():
+                func(*args)
+        except Exception:
+            logger.exception('Задача %s не выполнена', func.__qualname__)
+        return
+    name = f'{func.__module__}.{func.__qualname__}'
+    transaction.on_commit(lambda: _push(name, args, key))
+
+
+def _push(name, args, key):
+    Task.objects.bulk_create([
+        Task(name=name, args=json.dumps(list(args)), key=key)
+    ], ignore_conflicts=True)
+    if settings.TASKS_MODE == 'thread':
+        _pool().submit(drain)
+
+
+def _claim():
+    """
+    Забирает одну готовую задачу. Условный UPDATE по locked_until
+    не даёт двум воркерам взять одну задачу; ключ снимается, чтобы
+    новая постановка во время выполнения не потерялась.
+    """
+    while True:
+        now = timezone.now()
+        task = Task.objects.filter(run_at__lte=now).filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+        ).order_by('run_at', 'pk').first()
+        if task is None:
+            return None
+        if Task.objects.filter(
+            pk=task.pk, locked_until=task.locked_until
+        ).update(
+            locked_until=now + timedelta(seconds=settings.TASKS_LEASE),
+            attempts=F('attempts') + 1, key=None,
+        ):
+            task.attempts += 1
+            return task
+
+
+def _execute(task):
+    try:
+        import_string(task.name)(*json.loads(task.args))
+    except Exception:
+        error = traceback.format_exc()
+        if task.attempts >= settings.TASKS_MAX_ATTEMPTS:
+            logger.error('Задача %s не выполнена: %s', task.name, error)
+            run_at = None
+        else:
+            # Экспоненциальная пауза между попытками.
+            run_at = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+            )
+        Task.objects.filter(pk=task.pk).update(
+            run_at=run_at, locked_until=None, error=error
+        )
+        return False
+    Task.objects.filter(pk=task.pk).delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи; возвращает, сколько было взято."""
+    count = 0
+    while limit is None or count < limit:
+        task = _claim()
+        if task is None:
+            break
+        _execute(task)
+        count += 1
+    return count
+
+
+def drain():
+    """run_pending для фонового потока: своё соединение, основная база."""
+    close_old_connections()
+    try:
+        with use_primary():
+            return run_pending()
+    except Exception:
+        logger.exception('Ошибка при разборе очереди задач')
+    finally:
+        close_old_connections()
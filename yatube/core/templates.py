@@ -0,0 +1,132 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.template import Engine, Origin, TemplateDoesNotExist, engines
+from django.template.backends.django import DjangoTemplates, Template
+from django.template.loaders.base import Loader
+
+from . import metrics
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        if metrics.current() is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.record_template((time.perf_counter() - started) * 1000)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django с замером времени рендеринга для core.metrics."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self
+        )
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+def django_engines():
+    return [
+        backend.engine for backend in engines.all()
+        if isinstance(backend, DjangoTemplates)
+    ]
+
+
+def template_names(directories):
+    """Имена всех шаблонов в каталогах, как их передают в get_template."""
+    names = set()
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    path = os.path.join(root, filename)
+                    names.add(os.path.relpath(path, directory).replace(
+                        os.sep, '/'
+                    ))
+    return sorted(names)
+
+
+def build_bundle(engine, path):
+    """
+    Собирает исходники шаблонов из DIRS движка в один JSON-файл.
+
+    Шаблоны читаются с диска, минуя уже собранный пакет, и перед записью
+    компилируются, поэтому синтаксическая ошибка останавливает выкладку,
+    а не первый запрос к странице. Возвращает имена шаблонов пакета.
+    """
+    compiler = Engine(
+        dirs=engine.dirs,
+        loaders=['django.template.loaders.filesystem.Loader'],
+        libraries=engine.libraries,
+        file_charset=engine.file_charset,
+    )
+    sources = {}
+    for name in template_names(engine.dirs):
+        sources[name] = compiler.get_template(name).source
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as bundle:
+        json.dump(sources, bundle, ensure_ascii=False)
+    os.replace(temporary, path)
+    return list(sources)
+
+
+class BundleLoader(Loader):
+    """
+    Загрузчик шаблонов из пакета, собранного командой compile_templates.
+
+    Файл читается один раз на процесс; если пакета нет или шаблона в нём
+    нет, поиск продолжают следующие загрузчики.
+    """
+
+    def __init__(self, engine, path=None):
+        super().__init__(engine)
+        self.path = path or settings.TEMPLATE_BUNDLE
+        self._sources = None
+
+    @property
+    def sources(self):
+        if self._sources is None:
+            try:
+                with open(self.path, encoding='utf-8') as bundle:
+                    self._sources = json.load(bundle)
+            except (OSError, ValueError):
+                self._sources = {}
+        return self._sources
+
+    def get_template_sources(self, template_name):
+        if template_name in self.sources:
+            yield Origin(
+                name=f'{self.path}:{template_name}',
+                template_name=template_name,
+                loader=self,
+            )
+
+    def get_contents(self, origin):
+        try:
+            return self.sources[origin.template_name]
+        except KeyError:
+            raise TemplateDoesNotExist(origin)
+
+
+def warm_templates():
+    """
+    Компилирует все шаблоны из DIRS заранее, при старте процесса.
+
+    Имеет смысл только с кэширующим загрузчиком: разобранные шаблоны
+    остаются в его кэше, и первый запрос не платит за разбор.
+    """
+    names = []
+    for engine in django_engines():
+        for name in template_names(engine.dirs):
+            engine.get_template(name)
+            names.append(name)
+    return names
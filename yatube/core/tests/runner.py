@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import runner
+
+SQLITE_BACKEND = 'core.cache.SQLiteCache'
+
+
+def isolate_caches(suffix, directory=None):
+    """
+    Переносит файлы SQLiteCache в directory и дописывает к ним suffix,
+    остальным кэшам — к префиксу ключей; созданные экземпляры кэшей
+    сбрасываются.
+    """
+    for params in settings.CACHES.values():
+        if params['BACKEND'] == SQLITE_BACKEND:
+            location = params['LOCATION']
+            if directory is not None:
+                location = os.path.join(directory, os.path.basename(location))
+            params['LOCATION'] = location + suffix
+        else:
+            params['KEY_PREFIX'] = params.get('KEY_PREFIX', '') + suffix
+    caches._caches.caches = {}
+
+
+def _init_worker(counter):
+    runner._init_worker(counter)
+    isolate_caches(f'.{runner._worker_id}')
+
+
+class ParallelTestSuite(runner.ParallelTestSuite):
+    init_worker = _init_worker
+
+
+class TestRunner(runner.DiscoverRunner):
+    """
+    Тесты не трогают кэш сервера разработки: SQLiteCache лежит во
+    временном каталоге, у остальных кэшей свой префикс ключей. С
+    --parallel каждый процесс получает собственный кэш, как и базу.
+    Фоновые задачи выполняются сразу (TASKS_MODE=immediate): в
+    транзакции TestCase on_commit не наступает.
+    """
+    parallel_test_suite = ParallelTestSuite
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.TASKS_MODE = 'immediate'
+        self.cache_directory = tempfile.mkdtemp()
+        isolate_caches('.test', self.cache_directory)
+
+    def teardown_test_environment(self, **kwargs):
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
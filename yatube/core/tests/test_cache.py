@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase
+from core.cache import RedisCache, SQLiteCache
+
+
+class CacheTests:
+    """Поведение, общее для SQLiteCache и RedisCache."""
+
+    def test_shared_between_instances(self):
+        """Значения видны другим экземплярам кэша с тем же файлом."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.make_cache().get('key'), {'value': 1})
+        self.make_cache().delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_incr_and_expiry(self):
+        """add, incr и истечение срока жизни."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('expired', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('expired'))
+        self.assertTrue(self.cache.add('expired', 2))
+
+    def test_set_many(self):
+        """set_many записывает все значения одной транзакцией."""
+        self.cache.set_many({'a': 1, 'b': 2}, timeout=None)
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        self.assertEqual(self.cache.set_many({}), [])
+
+    def test_get_or_set_and_stats(self):
+        """get_or_set вычисляет значение один раз, промахи считаются."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 42
+
+        self.assertEqual(self.cache.get_or_set('answer', compute), 42)
+        self.assertEqual(self.cache.get_or_set('answer', compute), 42)
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(self.cache.has_key('answer:lock'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+class SQLiteCacheTest(CacheTests, SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self):
+        return SQLiteCache(os.path.join(self.directory, 'cache.sqlite3'), {
+            'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 100},
+        })
+
+    def test_tests_use_own_cache(self):
+        """Тесты работают не с файлом кэша сервера разработки."""
+        location = settings.CACHES['default']['LOCATION']
+        self.assertNotEqual(os.path.dirname(location), settings.BASE_DIR)
+
+    def test_lru_eviction(self):
+        """Вытесняются записи, к которым давно не обращались."""
+        for number, key in enumerate(('a', 'b', 'c')):
+            self.cache.set(key, number)
+        self.cache._connection().execute(
+            "UPDATE cache SET accessed = 0 WHERE key != ?",
+            (self.cache.make_key('c'),)
+        )
+        self.cache.get('a')
+        self.cache.set('d', 3)
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c', 'd']),
+            {'a': 0, 'c': 2, 'd': 3}
+        )
+
+
+@skipUnless(os.environ.get('REDIS_URL'), 'нужен сервер Redis в REDIS_URL')
+class RedisCacheTest(CacheTests, SimpleTestCase):
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.addCleanup(self.cache.clear)
+
+    def make_cache(self):
+        return RedisCache(os.environ['REDIS_URL'], {
+            'KEY_PREFIX': 'yatube-cache-test',
+        })
+
+    def test_clear_keeps_foreign_keys(self):
+        """clear() удаляет только ключи своего префикса."""
+        self.cache.set('key', 1)
+        self.cache._client.set('foreign', 1)
+        self.addCleanup(self.cache._client.delete, 'foreign')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache._client.exists('foreign'))
@@ -0,0 +1,157 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.backends.sqlite3.base import DatabaseWrapper
+from core.db import (PrimaryReplicaRouter, mark_replicated, pinned,
+                     read_after, replicate, use_primary)
+from core.middleware import ReadYourWritesMiddleware
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replicas(self):
+        """Чтения уходят в реплики, записи и миграции — в основную базу."""
+        self.assertIn(
+            self.router.db_for_read(Post), ['replica1', 'replica2']
+        )
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+    def test_use_primary(self):
+        """Внутри use_primary чтения идут в основную базу."""
+        with use_primary():
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+            self.assertTrue(pinned())
+        self.assertFalse(pinned())
+
+    def test_read_after(self):
+        """read_after оставляет только реплики, скопированные позже."""
+        mark_replicated(['replica1'], 100.0)
+        mark_replicated(['replica2'], 50.0)
+        with read_after(80.0):
+            self.assertEqual(self.router.db_for_read(Post), 'replica1')
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+        with read_after(120.0):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertIn(
+            self.router.db_for_read(Post), ['replica1', 'replica2']
+        )
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё читается из основной базы."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReadYourWritesMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(pinned())
+            return HttpResponse()
+
+        self.middleware = ReadYourWritesMiddleware(view)
+
+    def test_write_pins_following_reads(self):
+        """После POST браузер несколько секунд читает из основной базы."""
+        response = self.middleware(self.factory.post('/'))
+        cookie = response.cookies['primary_pin'].value
+        self.middleware(self.factory.get('/'))
+        request = self.factory.get('/')
+        request.COOKIES['primary_pin'] = cookie
+        self.middleware(request)
+        self.assertEqual(self.seen, [True, False, True])
+
+    def test_stale_pin_ignored(self):
+        """Устаревшая или битая кука не закрепляет чтения."""
+        for value in (str(time.time() - 60), 'broken'):
+            request = self.factory.get('/')
+            request.COOKIES['primary_pin'] = value
+            self.middleware(request)
+        self.assertEqual(self.seen, [False, False])
+        self.assertFalse(pinned())
+
+
+class ReplicateTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_replicate_copies_primary(self):
+        """Реплика получает схему и данные основной базы."""
+        source = os.path.join(self.directory, 'db.sqlite3')
+        target = os.path.join(self.directory, 'replica.sqlite3')
+        primary = sqlite3.connect(source)
+        primary.execute('CREATE TABLE item (name TEXT)')
+        primary.execute("INSERT INTO item VALUES ('first')")
+        primary.commit()
+        replicate(source, [target])
+        primary.execute("INSERT INTO item VALUES ('second')")
+        primary.commit()
+        primary.close()
+        replica = sqlite3.connect(target)
+        self.assertEqual(
+            replica.execute('SELECT name FROM item').fetchall(), [('first',)]
+        )
+        replica.close()
+        replicate(source, [target])
+        replica = sqlite3.connect(target)
+        self.assertEqual(
+            replica.execute('SELECT COUNT(*) FROM item').fetchone(), (2,)
+        )
+        replica.close()
+
+
+class SQLiteTuningTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def make_connection(self):
+        connection = DatabaseWrapper({
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(self.directory, 'db.sqlite3'),
+        }, alias='tuning')
+        self.addCleanup(connection.close)
+        return connection
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'WAL', 'busy_timeout': 1234
+    })
+    def test_pragmas_applied_on_connect(self):
+        """Прагмы из SQLITE_PRAGMAS выполняются при открытии соединения."""
+        connection = self.make_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    def test_atomic_takes_write_lock(self):
+        """transaction.atomic начинается с BEGIN IMMEDIATE."""
+        first, second = self.make_connection(), self.make_connection()
+        second.settings_dict['OPTIONS'] = {'timeout': 0}
+        with first.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (name TEXT)')
+        first._start_transaction_under_autocommit()
+        with self.assertRaises(OperationalError):
+            second._start_transaction_under_autocommit()
+        with first.cursor() as cursor:
+            cursor.execute('ROLLBACK')
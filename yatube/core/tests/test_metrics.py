@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    METRICS_SAMPLE_RATE=1,
+    METRICS_FILE=os.path.join(METRICS_DIR, 'metrics.bin'),
+)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Текст')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        metrics._stores.clear()
+        if os.path.exists(settings.METRICS_FILE):
+            os.remove(settings.METRICS_FILE)
+
+    def test_request_recorded(self):
+        """Запрос записывается с временем, SQL, шаблонами и кэшем."""
+        self.client.get(reverse('posts:index'))
+        entry = metrics.get_store().snapshot()['posts:index']
+        self.assertEqual(entry['request']['count'], 1)
+        self.assertEqual(sum(entry['request']['recent']), 1)
+        self.assertGreater(entry['queries'], 0)
+        self.assertGreater(entry['sql']['sum_ms'], 0)
+        self.assertGreater(entry['template']['sum_ms'], 0)
+        self.assertGreater(entry['cache_hits'] + entry['cache_misses'], 0)
+        self.assertEqual(entry['errors'], 0)
+
+    def test_shared_between_processes(self):
+        """Экземпляры хранилища с одним файлом видят общие данные."""
+        store = metrics.MetricsStore(settings.METRICS_FILE, 60)
+        store.record('view', 3, metrics.Sample())
+        other = metrics.MetricsStore(settings.METRICS_FILE, 60)
+        other.record('view', 30, metrics.Sample())
+        self.assertEqual(store.snapshot()['view']['request']['count'], 2)
+
+    def test_slots_overflow(self):
+        """Имена сверх числа слотов попадают в общий слот."""
+        store = metrics.get_store()
+        for number in range(metrics.SLOTS + 5):
+            store.record(f'view-{number}', 1, metrics.Sample())
+        snapshot = store.snapshot()
+        self.assertEqual(len(snapshot), metrics.SLOTS)
+        self.assertEqual(snapshot[metrics.OVERFLOW]['request']['count'], 6)
+
+    def test_quantile(self):
+        """Процентиль интерполируется внутри корзины."""
+        buckets = [0] * len(metrics.BUCKETS)
+        buckets[3] = 10
+        self.assertEqual(metrics.quantile(buckets, 0.5), 7.5)
+        self.assertIsNone(metrics.quantile([0] * len(buckets), 0.5))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_prometheus_endpoint(self):
+        """/metrics отдаёт текст Prometheus по токену сборщика."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            text
+        )
+        self.assertIn('yatube_queries_total{view="posts:index"}', text)
+        self.assertIn(
+            'yatube_request_recent_seconds{view="posts:index",'
+            'quantile="0.95"}', text
+        )
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(reverse('metrics'), **headers)
+                self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_prometheus_endpoint_access(self):
+        """Без настроенного токена /metrics открыт только staff."""
+        url = reverse('metrics')
+        self.assertEqual(
+            self.client.get(url, HTTP_AUTHORIZATION='Bearer ').status_code,
+            403
+        )
+        self.client.force_login(User.objects.create_user(
+            username='user'
+        ))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user(
+            username='admin', is_staff=True
+        ))
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from core import tasks
+from core.models import Task
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def fail(value):
+    raise RuntimeError(value)
+
+
+@override_settings(TASKS_MODE='worker')
+class TaskQueueTest(TransactionTestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_on_commit(self):
+        """Задача попадает в очередь после коммита, один раз на ключ."""
+        with transaction.atomic():
+            tasks.enqueue(record, 1, key='record')
+            tasks.enqueue(record, 1, key='record')
+            tasks.enqueue(record, 2)
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(Task.objects.count(), 2)
+        call_command('run_tasks', stdout=StringIO())
+        self.assertEqual(CALLS, [1, 2])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_MAX_ATTEMPTS=2, TASKS_RETRY_DELAY=0)
+    def test_retries(self):
+        """Упавшая задача повторяется, а потом остаётся с ошибкой."""
+        tasks.enqueue(fail, 'сбой')
+        self.assertEqual(tasks.run_pending(), 2)
+        task = Task.objects.get()
+        self.assertEqual(task.attempts, 2)
+        self.assertIsNone(task.run_at)
+        self.assertIn('сбой', task.error)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_claimed_once(self):
+        """Взятую задачу не получит другой воркер, пока она не зависла."""
+        tasks.enqueue(record, 1)
+        self.assertIsNotNone(tasks._claim())
+        self.assertIsNone(tasks._claim())
+
+    @override_settings(TASKS_MODE='immediate')
+    def test_immediate(self):
+        """В режиме immediate задача выполняется сразу, ошибка — в лог."""
+        tasks.enqueue(record, 1)
+        self.assertEqual(CALLS, [1])
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.enqueue(fail, 'сбой')
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.template import Context, Engine, TemplateDoesNotExist, engines
+from django.test import SimpleTestCase, override_settings
+
+from core.templates import build_bundle, template_names, warm_templates
+
+CACHED_TEMPLATES = [{
+    'BACKEND': 'core.templates.InstrumentedDjangoTemplates',
+    'DIRS': settings.TEMPLATES[0]['DIRS'],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'context_processors': (
+            settings.TEMPLATES[0]['OPTIONS']['context_processors']
+        ),
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'core.templates.BundleLoader',
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+
+class TemplateBundleTest(SimpleTestCase):
+    def setUp(self):
+        self.bundle = os.path.join(tempfile.mkdtemp(), 'bundle.json')
+
+    def test_compile_templates(self):
+        """compile_templates собирает все шаблоны из templates/."""
+        call_command(
+            'compile_templates', output=self.bundle, stdout=StringIO()
+        )
+        with open(self.bundle, encoding='utf-8') as bundle:
+            sources = json.load(bundle)
+        self.assertEqual(
+            sorted(sources), template_names(settings.TEMPLATES[0]['DIRS'])
+        )
+        self.assertIn('posts/index.html', sources)
+
+    def test_syntax_error_stops_build(self):
+        """Шаблон с синтаксической ошибкой не попадает в пакет."""
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, 'broken.html'), 'w') as template:
+            template.write('{% if %}')
+        with self.assertRaises(CommandError):
+            with self.settings(TEMPLATES=[{
+                'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                'DIRS': [directory],
+            }]):
+                call_command(
+                    'compile_templates', output=self.bundle,
+                    stdout=StringIO()
+                )
+        self.assertFalse(os.path.exists(self.bundle))
+
+    def test_bundle_loader(self):
+        """Шаблоны берутся из пакета, недостающие — с диска."""
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, 'page.html'), 'w') as template:
+            template.write('с диска')
+        build_bundle(Engine(dirs=[directory]), self.bundle)
+        with open(os.path.join(directory, 'page.html'), 'w') as template:
+            template.write('изменён после сборки')
+        with open(os.path.join(directory, 'new.html'), 'w') as template:
+            template.write('новый')
+        engine = Engine(dirs=[directory], loaders=[
+            ('core.templates.BundleLoader', self.bundle),
+            'django.template.loaders.filesystem.Loader',
+        ])
+        for name, text in (('page.html', 'с диска'), ('new.html', 'новый')):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    engine.get_template(name).render(Context()), text
+                )
+        with self.assertRaises(TemplateDoesNotExist):
+            engine.get_template('missing.html')
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_warm_templates(self):
+        """Прогрев заполняет кэш загрузчика всеми шаблонами."""
+        names = warm_templates()
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertIn('posts/index.html', names)
+        self.assertEqual(len(loader.get_template_cache), len(names))
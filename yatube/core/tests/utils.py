@@ -0,0 +1,52 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.db import connections
+from django.test import override_settings
+
+from core.db import mark_replicated
+
+
+class LaggingReplicaMixin:
+    """
+    Настоящая реплика-файл вместо TEST MIRROR: она видит основную базу
+    только такой, какой та была при последнем sync(). Нужна
+    TransactionTestCase — копируются лишь закоммиченные данные.
+    """
+    replica = 'lagging'
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.databases[self.replica] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'replica.sqlite3'),
+        }
+        self.addCleanup(self._drop_replica)
+        replicas = override_settings(DATABASE_REPLICAS=[self.replica])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        self.sync()
+
+    def _drop_replica(self):
+        connections[self.replica].close()
+        delattr(connections._connections, self.replica)
+        del connections.databases[self.replica]
+
+    def sync(self):
+        """Копирует основную базу в реплику, как replicate_sqlite."""
+        started = time.time()
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = connections[self.replica]
+        replica.close()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        mark_replicated([self.replica], started)
@@ -1,4 +1,12 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
 
 
 def page_not_found(request, exception):
@@ -11,3 +19,76 @@ def server_error(request):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def _labels(view, **extra):
+    labels = {'view': view, **extra}
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace(
+            '"', r'\"'
+        )) for name, value in labels.items()
+    )
+
+
+def _prometheus(snapshot, cache_stats):
+    lines = []
+    for series in metrics.SERIES:
+        metric = f'yatube_{series}_duration_seconds'
+        lines += [f'# TYPE {metric} histogram']
+        for view, entry in snapshot.items():
+            data = entry[series]
+            total = 0
+            for bound, count in zip(metrics.BUCKETS, data['buckets']):
+                total += count
+                le = '+Inf' if bound == float('inf') else bound / 1000
+                lines.append(
+                    f'{metric}_bucket{{{_labels(view, le=le)}}} {total}'
+                )
+            lines.append(
+                f'{metric}_sum{{{_labels(view)}}} {data["sum_ms"] / 1000}'
+            )
+            lines.append(f'{metric}_count{{{_labels(view)}}} {data["count"]}')
+        metric = f'yatube_{series}_recent_seconds'
+        lines.append(f'# TYPE {metric} gauge')
+        for view, entry in snapshot.items():
+            for share in QUANTILES:
+                value = metrics.quantile(entry[series]['recent'], share)
+                if value is not None:
+                    labels = _labels(view, quantile=share)
+                    lines.append(f'{metric}{{{labels}}} {value / 1000}')
+    for counter in metrics.COUNTERS:
+        metric = f'yatube_{counter}_total'
+        lines.append(f'# TYPE {metric} counter')
+        lines += [
+            f'{metric}{{{_labels(view)}}} {entry[counter]}'
+            for view, entry in snapshot.items()
+        ]
+    for name, value in cache_stats.items():
+        lines += [f'# TYPE yatube_cache_{name} gauge',
+                  f'yatube_cache_{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+def _metrics_allowed(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus: для staff и для сборщика
+    с токеном METRICS_TOKEN в заголовке Authorization: Bearer.
+    """
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    cache_stats = {}
+    if hasattr(cache, 'stats'):
+        cache_stats['entries'] = cache.stats()['entries']
+    return HttpResponse(
+        _prometheus(metrics.get_store().snapshot(), cache_stats),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,501 @@
+import itertools
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from faker import Faker
+
+from core.templates import template_names
+
+from . import counters, feeds
+from .models import Comment, Follow, Group, Post, User
+from .utils import CursorPaginator
+
+SEED_BATCH = 5000
+TEXT_POOL = 500
+
+
+def _chunks(total, size=SEED_BATCH):
+    for start in range(0, total, size):
+        yield range(start, min(start + size, total))
+
+
+def seed(users=100, groups=10, posts=10000, comments=20000, follows=1000,
+         random_seed=None):
+    """
+    Наполняет базу тестовыми данными пакетами через bulk_create.
+    С random_seed объём и распределение данных воспроизводимы.
+    """
+    if random_seed is not None:
+        random.seed(random_seed)
+        Faker.seed(random_seed)
+    fake = Faker('ru_RU')
+    texts = [fake.paragraph() for _ in range(TEXT_POOL)]
+    prefix = f'bench-{uuid.uuid4().hex[:8]}-'
+    for chunk in _chunks(users):
+        User.objects.bulk_create([
+            User(username=f'{prefix}{number}', password='!')
+            for number in chunk
+        ])
+    user_ids = list(User.objects.filter(
+        username__startswith=prefix
+    ).values_list('pk', flat=True))
+    Group.objects.bulk_create([
+        Group(
+            title=fake.sentence(nb_words=3), slug=f'{prefix}{number}',
+            description=random.choice(texts)
+        ) for number in range(groups)
+    ])
+    group_ids = list(Group.objects.filter(
+        slug__startswith=prefix
+    ).values_list('pk', flat=True)) + [None]
+    for chunk in _chunks(posts):
+        Post.objects.bulk_create([
+            Post(
+                author_id=random.choice(user_ids),
+                group_id=random.choice(group_ids),
+                text=random.choice(texts),
+            ) for _ in chunk
+        ])
+    post_ids = list(Post.objects.filter(
+        author_id__in=user_ids
+    ).values_list('pk', flat=True))
+    for chunk in _chunks(comments):
+        Comment.objects.bulk_create([
+            Comment(
+                post_id=random.choice(post_ids),
+                author_id=random.choice(user_ids),
+                text=random.choice(texts),
+            ) for _ in chunk
+        ])
+    edges = set()
+    while len(edges) < min(follows, len(user_ids) * (len(user_ids) - 1)):
+        user_id, author_id = random.sample(user_ids, 2)
+        edges.add((user_id, author_id))
+    Follow.objects.bulk_create(
+        [Follow(user_id=user, author_id=author) for user, author in edges],
+        ignore_conflicts=True
+    )
+    counters.create_missing_stats()
+    counters.reconcile_posts()
+    counters.reconcile_users()
+    for author_id in {author for _, author in edges}:
+        if not feeds.is_celebrity(author_id):
+            followers = Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True)
+            feeds.backfill(list(followers), author_id)
+    return prefix
+
+
+def view_urls():
+    """Адреса всех страниц чтения posts/views.py на самых тяжёлых данных."""
+    author = User.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    reader = User.objects.annotate(
+        total=Count('follower')
+    ).order_by('-total').first()
+    group = Group.objects.annotate(
+        total=Count('group_posts')
+    ).order_by('-total').first()
+    post = Post.objects.order_by('-comment_count', '-pk').first()
+    last_page = max(Post.objects.count() - 1, 0) // 10 + 1
+    urls = [
+        ('index', reverse('posts:index'), None),
+        ('index_last_page', f"{reverse('posts:index')}?page={last_page}",
+         None),
+    ]
+    if group is not None:
+        urls.append(('group_posts', reverse(
+            'posts:group_list', kwargs={'slug': group.slug}
+        ), None))
+    if author is not None:
+        urls.append(('profile', reverse(
+            'posts:profile', kwargs={'username': author.username}
+        ), None))
+    if post is not None:
+        urls.append(('post_detail', reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        ), None))
+    if reader is not None:
+        urls.append(('follow_index', reverse('posts:follow_index'), reader))
+    return urls
+
+
+def explain(sql):
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else (
+        'EXPLAIN '
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return [' '.join(str(column) for column in row)
+                for row in cursor.fetchall()]
+
+
+def measure(url, user=None, repeat=5, warm_cache=False):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    timings = []
+    for _ in range(repeat):
+        if not warm_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    selects = [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+    return {
+        'url': url,
+        'status': response.status_code,
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[int(0.95 * (len(timings) - 1))], 3),
+        'queries': len(context.captured_queries),
+        'plans': [
+            {'sql': sql, 'plan': explain(sql)} for sql in selects
+        ],
+    }
+
+
+def run(repeat=5, warm_cache=False):
+    return {
+        name: measure(url, user, repeat, warm_cache)
+        for name, url, user in view_urls()
+    }
+
+
+def compare(baseline, results, tolerance=0.2, metric='median_ms'):
+    """Список регрессий относительно сохранённого прогона."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if (result[metric] or 0) > (before[metric] or 0) * (1 + tolerance):
+            regressions.append(
+                f"{name}: {before[metric]} -> {result[metric]} ms"
+            )
+        if (result['queries'] or 0) > (before['queries'] or 0):
+            regressions.append(
+                f"{name}: {before['queries']} -> {result['queries']} queries"
+            )
+    return regressions
+
+
+def _percentile(timings, share):
+    if not timings:
+        return None
+    timings = sorted(timings)
+    return round(timings[int(share * (len(timings) - 1))], 3)
+
+
+def _request(client, kind, urls, texts, post_ids):
+    if kind == 'read':
+        _, url, _ = random.choice(urls)
+        return client.get(url).status_code == 200
+    if random.random() < 0.5:
+        response = client.post(
+            reverse('posts:post_create'), {'text': random.choice(texts)}
+        )
+    else:
+        response = client.post(reverse(
+            'posts:add_comment', kwargs={'post_id': random.choice(post_ids)}
+        ), {'text': random.choice(texts)})
+    return response.status_code == 302
+
+
+def _worker(kind, deadline, user, arguments, stats, lock):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    timings, errors = [], 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            ok = _request(client, kind, *arguments)
+        except Exception:
+            ok = False
+        if ok:
+            timings.append((time.perf_counter() - started) * 1000)
+        else:
+            errors += 1
+    connections.close_all()
+    with lock:
+        stats[kind]['timings'].extend(timings)
+        stats[kind]['errors'] += errors
+
+
+def concurrent(readers=4, writers=1, duration=10):
+    """
+    Смешанная нагрузка: readers потоков читают страницы из view_urls,
+    writers потоков публикуют посты и комментарии. Возвращает
+    пропускную способность и задержки отдельно для чтений и записей.
+    """
+    urls = view_urls()
+    authors = list(User.objects.filter(posts__isnull=False).distinct()[:50])
+    post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+    texts = [Faker('ru_RU').sentence() for _ in range(50)]
+    stats = {
+        kind: {'timings': [], 'errors': 0} for kind in ('read', 'write')
+    }
+    lock = threading.Lock()
+    arguments = (urls, texts, post_ids)
+    reader = next((user for _, _, user in urls if user is not None), None)
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(
+            'read', deadline, reader, arguments, stats, lock
+        )) for _ in range(readers)
+    ] + [
+        threading.Thread(target=_worker, args=(
+            'write', deadline, random.choice(authors), arguments, stats, lock
+        )) for _ in range(writers if authors and post_ids else 0)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        kind: {
+            'requests': len(result['timings']),
+            'errors': result['errors'],
+            'per_second': round(len(result['timings']) / elapsed, 1),
+            'median_ms': _percentile(result['timings'], 0.5),
+            'p95_ms': _percentile(result['timings'], 0.95),
+        } for kind, result in stats.items()
+    }
+
+
+# Маршруты, которые и на GET отвечают перенаправлением.
+REDIRECT_ROUTES = ('profile_follow', 'profile_unfollow')
+
+
+def route_urls():
+    """
+    Запросы ко всем маршрутам posts/urls.py, включая формы и записи:
+    (метка, имя маршрута, метод, адрес, пользователь, данные).
+    """
+    author = User.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    reader = User.objects.exclude(pk=author.pk).annotate(
+        total=Count('follower')
+    ).order_by('-total').first() or author
+    group = Group.objects.annotate(
+        total=Count('group_posts')
+    ).order_by('-total').first()
+    post = author.posts.order_by('-comment_count', '-pk').first()
+    word = max(post.text.split(), key=len).strip('.,')
+    entries = [
+        ('index', 'index', 'get', reverse('posts:index'), None, None),
+        ('profile', 'profile', 'get', reverse(
+            'posts:profile', kwargs={'username': author.username}
+        ), reader, None),
+        ('post_detail', 'post_detail', 'get', reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        ), reader, None),
+        ('post_create_form', 'post_create', 'get',
+         reverse('posts:post_create'), author, None),
+        ('post_create', 'post_create', 'post',
+         reverse('posts:post_create'), author, {'text': post.text}),
+        ('post_edit_form', 'post_edit', 'get', reverse(
+            'posts:post_edit', kwargs={'post_id': post.pk}
+        ), author, None),
+        ('post_edit', 'post_edit', 'post', reverse(
+            'posts:post_edit', kwargs={'post_id': post.pk}
+        ), author, {'text': post.text}),
+        ('add_comment', 'add_comment', 'post', reverse(
+            'posts:add_comment', kwargs={'post_id': post.pk}
+        ), reader, {'text': word}),
+        ('search', 'search', 'get', f"{reverse('posts:search')}?q={word}",
+         None, None),
+        ('follow_index', 'follow_index', 'get',
+         reverse('posts:follow_index'), reader, None),
+        ('profile_follow', 'profile_follow', 'get', reverse(
+            'posts:profile_follow', kwargs={'username': author.username}
+        ), reader, None),
+        ('profile_unfollow', 'profile_unfollow', 'get', reverse(
+            'posts:profile_unfollow', kwargs={'username': author.username}
+        ), reader, None),
+    ]
+    if group is not None:
+        entries.insert(1, ('group_posts', 'group_list', 'get', reverse(
+            'posts:group_list', kwargs={'slug': group.slug}
+        ), None, None))
+    return entries
+
+
+def _timed(client, method, url, data, expected):
+    """(успех, время в мс, число SQL-запросов) одного запроса."""
+    with CaptureQueriesContext(connection) as context:
+        started = time.perf_counter()
+        try:
+            status = getattr(client, method)(url, data or {}).status_code
+        except Exception:
+            status = None
+        elapsed = (time.perf_counter() - started) * 1000
+    return status == expected, elapsed, len(context)
+
+
+def _in_threads(worker, concurrency):
+    """Запускает worker в concurrency потоках; один поток — без потоков."""
+    if concurrency == 1:
+        worker()
+        return
+
+    def threaded():
+        try:
+            worker()
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=threaded) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def drive(entry, concurrency=4, requests=50):
+    """
+    Отправляет requests запросов к одному адресу из concurrency потоков
+    и возвращает пропускную способность, p50/p99 и число SQL-запросов.
+    """
+    _, route, method, url, user, data = entry
+    expected = 302 if method == 'post' or route in REDIRECT_ROUTES else 200
+    remaining = itertools.count()
+    timings, queries, errors = [], [], []
+
+    def worker():
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        while next(remaining) < requests:
+            ok, elapsed, count = _timed(client, method, url, data, expected)
+            if ok:
+                timings.append(elapsed)
+                queries.append(count)
+            else:
+                errors.append(1)
+
+    started = time.perf_counter()
+    _in_threads(worker, concurrency)
+    elapsed = time.perf_counter() - started
+    return {
+        'url': url,
+        'method': method.upper(),
+        'requests': len(timings),
+        'errors': len(errors),
+        'per_second': round(len(timings) / elapsed, 1),
+        'p50_ms': _percentile(timings, 0.5),
+        'p99_ms': _percentile(timings, 0.99),
+        'queries': int(statistics.median(queries)) if queries else None,
+    }
+
+
+def load(concurrency=4, requests=50):
+    return {
+        entry[0]: drive(entry, concurrency, requests)
+        for entry in route_urls()
+    }
+
+
+def check(results, max_p99=None, min_rps=None):
+    """Нарушения абсолютных порогов: ошибки, p99 и пропускная способность."""
+    violations = []
+    for name, result in results.items():
+        if result['errors']:
+            violations.append(f"{name}: {result['errors']} errors")
+        if max_p99 is not None and (result['p99_ms'] or 0) > max_p99:
+            violations.append(f"{name}: p99 {result['p99_ms']} ms")
+        if min_rps is not None and result['per_second'] < min_rps:
+            violations.append(f"{name}: {result['per_second']} req/s")
+    return violations
+
+
+# Режимы загрузки шаблонов для render_feed: как при DEBUG = True
+# (каждый get_template читает и разбирает файл заново) и как в
+# settings_production (кэширующий загрузчик, заранее скомпилированный).
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_MODES = {
+    'default': {'debug': True, 'loaders': BASE_LOADERS},
+    'cached': {'debug': False, 'loaders': [
+        ('django.template.loaders.cached.Loader',
+         ['core.templates.BundleLoader'] + BASE_LOADERS),
+    ]},
+}
+
+
+def _template_backend(mode):
+    base = settings.TEMPLATES[0]
+    return DjangoTemplates({
+        'NAME': f'benchmark-{mode}',
+        'DIRS': base['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': base['OPTIONS']['context_processors'],
+            **TEMPLATE_MODES[mode],
+        },
+    })
+
+
+def render_feed(posts=10, repeat=200, template='posts/index.html'):
+    """
+    Время рендеринга страницы ленты из posts постов в каждом режиме
+    TEMPLATE_MODES. Кэш фрагментов страницы на время замера отключён,
+    иначе рендерился бы только первый проход; карточки постов
+    по-прежнему берутся из основного кэша.
+    """
+    paginator = CursorPaginator(Post.objects.for_feed(), posts)
+    page = paginator.cursor_page()
+    request = RequestFactory().get(reverse('posts:index'))
+    request.user = AnonymousUser()
+    results = {}
+    caches = dict(settings.CACHES, template_fragments={
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+    })
+    with override_settings(CACHES=caches):
+        for mode in TEMPLATE_MODES:
+            backend = _template_backend(mode)
+            started = time.perf_counter()
+            if mode == 'cached':
+                for name in template_names(backend.engine.dirs):
+                    backend.engine.get_template(name)
+            warmup_ms = (time.perf_counter() - started) * 1000
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                backend.get_template(template).render(
+                    {'page_obj': page, 'feed_version': uuid.uuid4().hex},
+                    request
+                )
+                timings.append((time.perf_counter() - started) * 1000)
+            results[mode] = {
+                'posts': len(page),
+                'warmup_ms': round(warmup_ms, 3),
+                'first_ms': round(timings[0], 3),
+                'median_ms': round(statistics.median(timings), 3),
+                'p95_ms': _percentile(timings, 0.95),
+            }
+    return results
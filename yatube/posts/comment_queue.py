@@ -0,0 +1,67 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from core.db import use_primary
+
+from . import counters, versions
+from .models import Comment, PendingComment
+from .transfer import insert_rows
+
+
+def enqueue(post_id, author, text):
+    """
+    Принимает комментарий одной вставкой в PendingComment. Счётчики
+    пересчитывает flush для всей пачки, а версия страницы поста
+    меняется сразу: иначе условный GET вернул бы автору 304 без его
+    комментария.
+    """
+    pending = PendingComment.objects.create(
+        post_id=post_id, author=author, text=text
+    )
+    versions.bump([versions.post_feed(post_id)])
+    return pending
+
+
+def pending_for(post, user):
+    """Ещё не перенесённые комментарии пользователя, новые первыми."""
+    if not user.is_authenticated:
+        return []
+    return list(PendingComment.objects.filter(
+        post=post, author=user
+    ).select_related('author').order_by('-pk'))
+
+
+def flush(batch_size=None):
+    """
+    Переносит очередь в Comment пачками по batch_size. Каждая пачка —
+    одна транзакция: вставка комментариев с исходным временем,
+    счётчики постов и удаление из очереди, поэтому сбой посередине
+    не теряет и не дублирует комментарии. Возвращает их число.
+    """
+    batch_size = batch_size or settings.COMMENT_QUEUE_BATCH
+    total = 0
+    # Очередь читается только из основной базы: отстающая реплика
+    # вернула бы уже перенесённые строки ещё раз.
+    with use_primary():
+        while True:
+            with transaction.atomic():
+                pending = list(
+                    PendingComment.objects.order_by('pk')[:batch_size]
+                )
+                if not pending:
+                    return total
+                insert_rows(Comment, [Comment(
+                    post_id=item.post_id, author_id=item.author_id,
+                    text=item.text, created=item.created,
+                ) for item in pending])
+                added = Counter(item.post_id for item in pending)
+                for post_id, count in added.items():
+                    counters.bump_post(post_id, comment_count=count)
+                PendingComment.objects.filter(
+                    pk__in=[item.pk for item in pending]
+                ).delete()
+            for post_id in added:
+                versions.bump_post(post_id)
+            total += len(pending)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Comment
+from .utils import decode_token, encode_token
+
+PREFIX = 'post_comments:'
+
+
+def decode_comment_cursor(token):
+    """id, с которого продолжать, или ValueError для битого курсора."""
+    data = decode_token(token)
+    if not isinstance(data, list) or len(data) != 1 or not isinstance(
+        data[0], int
+    ) or isinstance(data[0], bool):
+        raise ValueError(token)
+    return data[0]
+
+
+def _page(post_id, before, limit):
+    comments = Comment.objects.filter(
+        post_id=post_id
+    ).select_related('author').order_by('-pk')
+    if before is not None:
+        comments = comments.filter(pk__lt=before)
+    page = list(comments[:limit + 1])
+    next_cursor = encode_token([page[limit - 1].pk]) if (
+        len(page) > limit
+    ) else None
+    return page[:limit], next_cursor
+
+
+def comment_page(post, token=None, limit=None):
+    """
+    Страница комментариев поста от новых к старым и курсор следующей.
+
+    Первая страница кэшируется по ключу из id поста и Post.updated:
+    новый или удалённый комментарий меняет счётчик и Post.updated,
+    поэтому add_comment сам делает старую страницу недостижимой.
+    """
+    limit = limit or settings.COMMENTS_PAGE_SIZE
+    if token:
+        return _page(post.pk, decode_comment_cursor(token), limit)
+    key = f'{PREFIX}{post.pk}:{post.updated.timestamp()}:{limit}'
+    page = cache.get(key)
+    if page is None:
+        page = _page(post.pk, None, limit)
+        cache.set(key, page, settings.COMMENTS_CACHE_TIMEOUT)
+    return page
+
+
+def newer_comments(post_id, after, limit=None):
+    """Комментарии с id больше after, от старых к новым."""
+    limit = limit or settings.COMMENTS_PAGE_SIZE
+    return list(Comment.objects.filter(
+        post_id=post_id, pk__gt=after
+    ).select_related('author').order_by('pk')[:limit])
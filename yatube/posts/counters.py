@@ -0,0 +1,101 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, User, UserStats
+
+RECONCILE_BATCH = 1000
+
+USER_COUNTERS = (
+    ('post_count', Post, 'author'),
+    ('follower_count', Follow, 'author'),
+    ('following_count', Follow, 'user'),
+)
+
+
+def bump(queryset, **deltas):
+    queryset.update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def bump_user(user_id, **deltas):
+    bump(UserStats.objects.filter(user_id=user_id), **deltas)
+
+
+def bump_post(post_id, **deltas):
+    # Счётчик виден в карточке поста, поэтому меняется и Post.updated.
+    Post.objects.filter(pk=post_id).update(updated=timezone.now(), **{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def actual_count(model, field, outer='pk'):
+    total = model.objects.filter(
+        **{field: OuterRef(outer)}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+
+def _batches(queryset, batch_size):
+    last = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        ids = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def _reconcile(model, counters, batch_size, touch=None):
+    fixed = 0
+    fields = [field for field, _, _ in counters]
+    for ids in _batches(model.objects.all(), batch_size):
+        rows = model.objects.filter(pk__in=ids).annotate(**{
+            f'actual_{field}': actual_count(related, lookup)
+            for field, related, lookup in counters
+        })
+        drifted = []
+        for row in rows:
+            changed = False
+            for field in fields:
+                actual = getattr(row, f'actual_{field}')
+                if getattr(row, field) != actual:
+                    setattr(row, field, actual)
+                    changed = True
+            if changed:
+                if touch:
+                    setattr(row, touch, timezone.now())
+                drifted.append(row)
+        model.objects.bulk_update(
+            drifted, fields + ([touch] if touch else []),
+            batch_size=batch_size
+        )
+        fixed += len(drifted)
+    return fixed
+
+
+def create_missing_stats(batch_size=RECONCILE_BATCH):
+    created = 0
+    missing = User.objects.filter(stats__isnull=True)
+    for ids in _batches(missing, batch_size):
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id in ids],
+            ignore_conflicts=True
+        )
+        created += len(ids)
+    return created
+
+
+def reconcile_posts(batch_size=RECONCILE_BATCH):
+    return _reconcile(
+        Post, (('comment_count', Comment, 'post'),), batch_size,
+        touch='updated'
+    )
+
+
+def reconcile_users(batch_size=RECONCILE_BATCH):
+    return _reconcile(UserStats, USER_COUNTERS, batch_size)
@@ -0,0 +1,95 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from core.db import read_after
+
+from . import versions
+from .feeds import followed_celebrities
+from .models import User
+
+
+def _set_validators(request, response, etag, modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+
+
+def feed_conditional(feeds_func, viewer=False):
+    """
+    Условный GET по версиям лент.
+
+    feeds_func(request, *args, **kwargs) возвращает ленты, из которых
+    собрана страница (или None, если страницы нет), либо пару (ленты
+    страницы, ленты только для ETag) — для данных вне фрагментного
+    кэша, вроде счётчиков профиля. ETag и Last-Modified
+    считаются по их версиям без рендеринга, и при совпадении с
+    If-None-Match / If-Modified-Since сразу отдаётся 304. Строка версий
+    сохраняется в request.feed_version для ключей фрагментного кэша.
+    Страница рендерится только из реплик, скопированных после последнего
+    изменения её лент (core.db.read_after), иначе из основной базы.
+    С viewer=True в ETag входят и подписки зрителя (кнопка «Подписаться»).
+    В ETag входит и CSRF-секрет зрителя, поэтому после входа, когда
+    секрет меняется, страница с формой рендерится заново.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            feeds = feeds_func(request, *args, **kwargs)
+            if feeds is None:
+                return view(request, *args, **kwargs)
+            feeds, tagged = feeds if isinstance(feeds, tuple) else (feeds, [])
+            user = request.user
+            tagged = list(feeds) + list(tagged)
+            if viewer and user.is_authenticated:
+                tagged.append(versions.following_feed(user.pk))
+            state, modified = versions.get_state(tagged)
+            request.feed_version = versions.version_string(state, feeds)
+            # Страницы с формами несут CSRF-токен, а вход меняет его:
+            # со старым ETag браузер отправил бы форму с устаревшим.
+            csrf = request.META.get('CSRF_COOKIE', '')
+            etag = quote_etag(hashlib.md5(
+                f'{versions.version_string(state, tagged)}|{user.pk}|{csrf}'
+                .encode()
+            ).hexdigest())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=int(modified)
+            )
+            if response is None:
+                with read_after(modified):
+                    response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                _set_validators(request, response, etag, int(modified))
+            return response
+        return wrapper
+    return decorator
+
+
+def profile_feeds(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    if author_id is None:
+        return None
+    return [versions.author_feed(author_id)], [
+        versions.author_stats(author_id)
+    ]
+
+
+def follow_feeds(request):
+    """
+    follow_feed меняется при подписках и раскладке постов в FeedEntry.
+    Посты «знаменитостей» читаются напрямую, поэтому их ленты авторов
+    тоже входят в версию.
+    """
+    return [versions.follow_feed(request.user.pk)] + [
+        versions.author_feed(author_id)
+        for author_id in followed_celebrities(request.user)
+    ]
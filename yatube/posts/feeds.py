@@ -0,0 +1,231 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+
+from .following import following_ids
+from .models import FeedEntry, Follow, Post, UserStats
+from .utils import CURSOR_NEXT, after_cursor
+
+FAN_OUT_BATCH = 500
+# Больше подписок не передаём в IN (...), а соединяем с Follow в SQL.
+FOLLOWING_IN_LIMIT = 500
+
+
+def follower_count(author_id):
+    stats = UserStats.objects.filter(user_id=author_id).values_list(
+        'follower_count', flat=True
+    ).first()
+    return stats or 0
+
+
+def is_celebrity(author_id):
+    return follower_count(author_id) >= settings.FEED_CELEBRITY_FOLLOWERS
+
+
+def _bulk_add(user_ids, posts):
+    """posts — пары (id, pub_date)."""
+    entries = [
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id in user_ids for post_id, pub_date in posts
+    ]
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=FAN_OUT_BATCH, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    fan_out_posts([post.pk])
+
+
+def fan_out_posts(post_ids):
+    """
+    fan_out_post для пачки постов: один INSERT ... SELECT из подписок,
+    без объектов FeedEntry в Python. Возвращает id подписчиков, чьи
+    ленты получили посты.
+    """
+    if not post_ids:
+        return []
+    pairs = Post.objects.filter(pk__in=post_ids).exclude(
+        author__stats__follower_count__gte=settings.FEED_CELEBRITY_FOLLOWERS
+    ).filter(author__following__isnull=False).order_by().values_list(
+        'author__following__user_id', 'pk', 'pub_date'
+    )
+    select, params = pairs.query.sql_with_params()
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{FeedEntry._meta.db_table} (user_id, post_id, pub_date) '
+            f'{select} '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            params
+        )
+    return sorted(set(pairs.values_list(
+        'author__following__user_id', flat=True
+    )))
+
+
+def backfill(user_ids, author_id):
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_POSTS]
+    _bulk_add(user_ids, list(posts))
+
+
+def rebuild(user_ids=None):
+    """
+    Собирает ленты заново из подписок: FEED_BACKFILL_POSTS последних
+    постов каждого автора, кроме «знаменитостей», одним INSERT ...
+    SELECT. Без user_ids — ленты всех пользователей. Возвращает число
+    записей.
+    """
+    where, params = '', []
+    entries = FeedEntry.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        where = f'AND follow.user_id IN ({", ".join(["%s"] * len(user_ids))})'
+        params = user_ids
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+    follow = Follow._meta.db_table
+    post = Post._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {follow} follow JOIN ('
+            f'SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            f'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            f') AS position FROM {post}'
+            f') post ON post.author_id = follow.author_id '
+            f'WHERE post.position <= %s AND follow.author_id NOT IN ('
+            f'SELECT user_id FROM {UserStats._meta.db_table} '
+            f'WHERE follower_count >= %s) {where}',
+            [
+                settings.FEED_BACKFILL_POSTS,
+                settings.FEED_CELEBRITY_FOLLOWERS,
+                *params,
+            ]
+        )
+        return cursor.rowcount
+
+
+def on_follow(user_id, author_id):
+    if not is_celebrity(author_id):
+        backfill([user_id], author_id)
+
+
+def on_unfollow(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    # Автор перестал быть «знаменитостью»: его посты больше не
+    # подмешиваются при чтении, поэтому раскладываем их по лентам.
+    if follower_count(author_id) == settings.FEED_CELEBRITY_FOLLOWERS - 1:
+        user_ids = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+        backfill(list(user_ids), author_id)
+
+
+def followed_celebrities(user):
+    """
+    «Знаменитости» среди подписок пользователя. Подписки берутся из
+    posts.following, так что без подписок запроса к базе нет.
+    """
+    ids = following_ids(user)
+    if not ids:
+        return []
+    if len(ids) > FOLLOWING_IN_LIMIT:
+        return Follow.objects.filter(
+            user=user, author__stats__follower_count__gte=(
+                settings.FEED_CELEBRITY_FOLLOWERS
+            )
+        ).order_by('author_id').values_list('author_id', flat=True)
+    return UserStats.objects.filter(
+        user_id__in=ids,
+        follower_count__gte=settings.FEED_CELEBRITY_FOLLOWERS
+    ).order_by('user_id').values_list('user_id', flat=True)
+
+
+class FollowFeed:
+    """
+    Лента подписок: материализованные записи FeedEntry пользователя
+    плюс посты «знаменитостей», которые читаются напрямую.
+
+    CursorPaginator берёт окно через cursor_window: записи FeedEntry
+    идут по индексу (user, -pub_date, -post) без соединения с Post,
+    посты «знаменитостей» — отдельным запросом с тем же LIMIT, окна
+    сливаются в Python, а посты страницы читаются одним запросом по id.
+    Для нумерованных страниц (?page=) лента ведёт себя как выборка Post.
+    """
+    ordered = True
+
+    def __init__(self, user, celebrities):
+        self.user = user
+        self.celebrities = list(celebrities)
+
+    def posts(self):
+        condition = Q(pk__in=FeedEntry.objects.filter(
+            user=self.user
+        ).values('post_id'))
+        if self.celebrities:
+            condition |= Q(author_id__in=self.celebrities)
+        return Post.objects.filter(condition).for_feed().order_by(
+            '-pub_date', '-pk'
+        )
+
+    def count(self):
+        return self.posts().count()
+
+    def __getitem__(self, key):
+        return self.posts()[key]
+
+    def entries(self, cursor=None):
+        return after_cursor(
+            FeedEntry.objects.filter(user=self.user), cursor, pk='post_id'
+        ).values_list('pub_date', 'post_id')
+
+    def cursor_window(self, cursor, limit):
+        keys = list(self.entries(cursor)[:limit])
+        if self.celebrities:
+            keys += after_cursor(
+                Post.objects.filter(author_id__in=self.celebrities), cursor
+            ).values_list('pub_date', 'pk')[:limit]
+        descending = cursor is None or cursor[0] == CURSOR_NEXT
+        keys = sorted(set(keys), reverse=descending)[:limit]
+        posts = Post.objects.for_feed().in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+
+def follow_feed(user, celebrities):
+    return FollowFeed(user, celebrities)
+
+
+def trim(keep=None):
+    """
+    Оставляет в ленте каждого пользователя keep новейших записей
+    (FEED_MAX_ENTRIES): так глубина ленты и размер таблицы не растут
+    без предела. Более старые посты в ленте подписок больше не видны.
+    Возвращает число удалённых записей.
+    """
+    keep = keep or settings.FEED_MAX_ENTRIES
+    user_ids = FeedEntry.objects.values('user_id').annotate(
+        entries=Count('pk')
+    ).filter(entries__gt=keep).values_list('user_id', flat=True)
+    deleted = 0
+    for user_id in list(user_ids):
+        pub_date, post_id = FeedEntry.objects.filter(
+            user_id=user_id
+        ).order_by('-pub_date', '-post_id').values_list(
+            'pub_date', 'post_id'
+        )[keep - 1]
+        deleted += FeedEntry.objects.filter(user_id=user_id).filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, post_id__lt=post_id)
+        ).delete()[0]
+    return deleted
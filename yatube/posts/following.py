@@ -0,0 +1,54 @@
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+PREFIX = 'following_ids:'
+
+
+def _key(user_id):
+    return f'{PREFIX}{user_id}'
+
+
+def following_ids(user):
+    """
+    id авторов, на которых подписан пользователь, — frozenset для
+    проверки «A подписан на B» без запроса к базе.
+
+    В общем кэше список лежит компактным array целых чисел; в пределах
+    запроса множество запоминается на объекте пользователя, поэтому
+    декоратор feed_conditional и сама view читают кэш один раз.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    memo = getattr(user, '_following_ids', None)
+    if memo is not None:
+        return memo
+    ids = cache.get(_key(user.pk))
+    if ids is None:
+        ids = array('q', sorted(Follow.objects.filter(
+            user_id=user.pk
+        ).values_list('author_id', flat=True)))
+        cache.set(_key(user.pk), ids, settings.FOLLOWING_CACHE_TIMEOUT)
+    user._following_ids = frozenset(ids)
+    return user._following_ids
+
+
+def is_following(user, author_id):
+    return author_id in following_ids(user)
+
+
+def invalidate(user_id):
+    # Второе удаление после коммита: читатель, заполнивший кэш
+    # до коммита, мог положить туда старый список.
+    cache.delete(_key(user_id))
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
+
+
+def forget(user):
+    """Сбрасывает множество, запомненное на объекте пользователя."""
+    if getattr(user, '_following_ids', None) is not None:
+        del user._following_ids
@@ -0,0 +1,105 @@
+from django.db import connection, transaction
+
+from core.db import supports_returning
+
+from . import counters, feeds, following, versions
+from .models import Follow, User, UserStats
+
+
+def _insert_sql(user_id, author_ids):
+    # Несуществующие id и подписка на себя отсекаются тем же запросом.
+    ops = connection.ops
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{Follow._meta.db_table} (user_id, author_id) '
+        f'SELECT %s, id FROM {User._meta.db_table} '
+        f'WHERE id IN ({placeholders}) AND id <> %s '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    return sql, [user_id, *author_ids, user_id]
+
+
+def _delete_sql(user_id, author_ids):
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    sql = (
+        f'DELETE FROM {Follow._meta.db_table} '
+        f'WHERE user_id = %s AND author_id IN ({placeholders})'
+    )
+    return sql, [user_id, *author_ids]
+
+
+def _execute(build, user_id, author_ids):
+    """
+    Выполняет запрос build для пачки авторов и возвращает id тех, для
+    кого строка реально вставлена или удалена: одним запросом с
+    RETURNING, а где его нет — запросом на автора с проверкой rowcount.
+    """
+    author_ids = list(dict.fromkeys(author_ids))
+    if not author_ids:
+        return []
+    with connection.cursor() as cursor:
+        if supports_returning(connection):
+            sql, params = build(user_id, author_ids)
+            cursor.execute(f'{sql} RETURNING author_id', params)
+            return [row[0] for row in cursor.fetchall()]
+        changed = []
+        for author_id in author_ids:
+            cursor.execute(*build(user_id, [author_id]))
+            if cursor.rowcount:
+                changed.append(author_id)
+        return changed
+
+
+def _bump_feeds(user_id, author_ids):
+    following.invalidate(user_id)
+    versions.bump([
+        versions.follow_feed(user_id),
+        versions.following_feed(user_id),
+        versions.author_stats(user_id),
+    ] + [versions.author_stats(author_id) for author_id in author_ids])
+
+
+def on_followed(user_id, author_ids):
+    """Счётчики, ленты и кэши после новых подписок user_id."""
+    counters.bump_user(user_id, following_count=len(author_ids))
+    counters.bump(
+        UserStats.objects.filter(user_id__in=author_ids), follower_count=1
+    )
+    for author_id in author_ids:
+        feeds.on_follow(user_id, author_id)
+    _bump_feeds(user_id, author_ids)
+
+
+def on_unfollowed(user_id, author_ids):
+    counters.bump_user(user_id, following_count=-len(author_ids))
+    counters.bump(
+        UserStats.objects.filter(user_id__in=author_ids), follower_count=-1
+    )
+    for author_id in author_ids:
+        feeds.on_unfollow(user_id, author_id)
+    _bump_feeds(user_id, author_ids)
+
+
+@transaction.atomic
+def follow(user, author_ids):
+    """
+    Подписывает user на авторов одним INSERT ... ON CONFLICT DO NOTHING.
+    Повторные подписки, подписка на себя и неизвестные id пропускаются.
+    Возвращает id авторов, подписка на которых действительно появилась.
+    """
+    added = _execute(_insert_sql, user.pk, author_ids)
+    if added:
+        on_followed(user.pk, added)
+        following.forget(user)
+    return added
+
+
+@transaction.atomic
+def unfollow(user, author_ids):
+    """Отписка одним DELETE; возвращает id реально удалённых подписок."""
+    removed = _execute(_delete_sql, user.pk, author_ids)
+    if removed:
+        on_unfollowed(user.pk, removed)
+        following.forget(user)
+    return removed
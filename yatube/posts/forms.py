@@ -1,7 +1,34 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.forms import ModelForm
+from PIL import Image
 from .models import Post, Comment
 
 
+def check_image_limits(image):
+    """Проверяет размер файла и картинки по заголовку, не декодируя её."""
+    if getattr(image, 'too_large', False):
+        raise ValidationError(
+            'Файл больше %(size)s МБ.',
+            code='too_large',
+            params={'size': settings.POST_IMAGE_MAX_BYTES // 2 ** 20},
+        )
+    try:
+        image.seek(0)
+        with Image.open(image) as header:
+            width, height = header.size
+    except Exception:
+        return
+    finally:
+        image.seek(0)
+    if max(width, height) > settings.POST_IMAGE_MAX_SIDE:
+        raise ValidationError(
+            'Картинка больше %(side)s пикселей по стороне.',
+            code='too_many_pixels',
+            params={'side': settings.POST_IMAGE_MAX_SIDE},
+        )
+
+
 class PostForm(ModelForm):
     class Meta:
         model = Post
@@ -15,6 +42,24 @@ class PostForm(ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.image_error = None
+        image = self.files.get('image')
+        if image is not None:
+            try:
+                check_image_limits(image)
+            except ValidationError as error:
+                self.image_error = error
+                self.files = self.files.copy()
+                self.files.pop('image')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.image_error is not None:
+            self.add_error('image', self.image_error)
+        return cleaned_data
+
 
 class CommentForm(ModelForm):
     class Meta:
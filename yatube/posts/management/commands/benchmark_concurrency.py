@@ -0,0 +1,35 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность страниц posts/views.py '
+        'при одновременных чтениях и записях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **options):
+        results = benchmark.concurrent(
+            options['readers'], options['writers'], options['duration']
+        )
+        self.stdout.write(f'Прагмы SQLite: {settings.SQLITE_PRAGMAS or "-"}')
+        for kind, result in results.items():
+            self.stdout.write(
+                f"{kind:<6} {result['per_second']:>8.1f} req/s  "
+                f"median {result['median_ms']} ms  "
+                f"p95 {result['p95_ms']} ms  "
+                f"errors {result['errors']}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга страницы ленты без кэширования '
+        'шаблонов и с кэширующим загрузчиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **options):
+        results = benchmark.render_feed(options['posts'], options['repeat'])
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<8} posts {result['posts']}  "
+                f"warmup {result['warmup_ms']:>8.2f} ms  "
+                f"first {result['first_ms']:>7.2f} ms  "
+                f"median {result['median_ms']:>7.2f} ms  "
+                f"p95 {result['p95_ms']:>7.2f} ms"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
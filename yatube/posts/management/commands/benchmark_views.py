@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время, число запросов и планы запросов (EXPLAIN) '
+        'страниц posts/views.py'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--warm-cache', action='store_true')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON предыдущего прогона для сравнения'
+        )
+        parser.add_argument('--tolerance', type=float, default=0.2)
+        parser.add_argument('--plans', action='store_true')
+
+    def handle(self, *args, **options):
+        results = benchmark.run(options['repeat'], options['warm_cache'])
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<16} {result['status']} "
+                f"median {result['median_ms']:>9.2f} ms  "
+                f"p95 {result['p95_ms']:>9.2f} ms  "
+                f"queries {result['queries']}"
+            )
+            if options['plans']:
+                for query in result['plans']:
+                    self.stdout.write(f"    {query['sql']}")
+                    for line in query['plan']:
+                        self.stdout.write(f'        {line}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = benchmark.compare(
+                    json.load(baseline), results, options['tolerance']
+                )
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions)
+                )
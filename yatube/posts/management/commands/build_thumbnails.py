@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры картинок постов'
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(
+            thumbnail_source=F('image')
+        ).values_list('pk', flat=True).order_by('pk')
+        built = 0
+        for post_id in post_ids.iterator():
+            thumbnails.generate(post_id)
+            built += 1
+        self.stdout.write(f'Обработано постов: {built}')
@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии или подписки в NDJSON/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(transfer.KINDS))
+        parser.add_argument('path', help='Файл или - для stdout')
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.TRANSFER_BATCH
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = transfer.file_format(path, options['format'])
+        if path == '-':
+            total = transfer.export_rows(
+                options['kind'], sys.stdout, fmt, options['batch_size']
+            )
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as output:
+                total = transfer.export_rows(
+                    options['kind'], output, fmt, options['batch_size']
+                )
+        self.stderr.write(f"{options['kind']}: выгружено строк {total}")
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.comment_queue import flush
+
+
+class Command(BaseCommand):
+    help = 'Переносит комментарии из очереди PendingComment в Comment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять перенос каждые N секунд'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Комментариев в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = flush(options['batch_size'])
+            self.stdout.write(f'Перенесено комментариев: {count}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
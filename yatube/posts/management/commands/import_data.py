@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии или подписки из NDJSON/CSV '
+        'пачками с контрольными точками. Порядок: groups, posts, '
+        'comments, follows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(transfer.KINDS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.TRANSFER_BATCH
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на контрольную точку'
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не обновлять счётчики, ленты и поисковый индекс'
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        started = time.monotonic()
+        resumed = 0 if options['restart'] else transfer.read_checkpoint(path)
+        if resumed:
+            self.stderr.write(f'{kind}: продолжаем со строки {resumed}')
+
+        def progress(done):
+            rate = (done - resumed) / max(time.monotonic() - started, 1e-6)
+            self.stderr.write(f'{kind}: {done} строк, {rate:.0f} строк/с')
+
+        loaded = transfer.import_rows(
+            kind, path, transfer.file_format(path, options['format']),
+            batch_size=options['batch_size'],
+            resume=not options['restart'],
+            derived=not options['skip_derived'],
+            progress=progress,
+        )
+        self.stdout.write(f'{kind}: загружено строк {loaded}')
+        if kind == 'posts':
+            self.stdout.write(
+                'Файлы картинок копируются отдельно; миниатюры построит '
+                'команда build_thumbnails'
+            )
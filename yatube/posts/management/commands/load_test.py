@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон всех адресов posts/urls.py с фиксированной '
+        'параллельностью и порогами, при нарушении которых команда падает'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Сначала наполнить базу данными (объёмы ниже)'
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument('--random-seed', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--max-p99', type=float, help='Порог p99, мс')
+        parser.add_argument(
+            '--min-rps', type=float, help='Минимум запросов в секунду'
+        )
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON предыдущего прогона для сравнения'
+        )
+        parser.add_argument('--tolerance', type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            benchmark.seed(
+                users=options['users'],
+                groups=options['groups'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                random_seed=options['random_seed'],
+            )
+        results = benchmark.load(options['concurrency'], options['requests'])
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<18} {result['method']:<4} "
+                f"{result['per_second']:>8.1f} req/s  "
+                f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  "
+                f"queries {result['queries']}  errors {result['errors']}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        problems = benchmark.check(
+            results, options['max_p99'], options['min_rps']
+        )
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                problems += benchmark.compare(
+                    json.load(baseline), results, options['tolerance'],
+                    metric='p50_ms'
+                )
+        if problems:
+            raise CommandError(
+                'Нарушены пороги производительности:\n' + '\n'.join(problems)
+            )
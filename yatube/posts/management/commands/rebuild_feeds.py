@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.db import use_primary
+from posts import feeds, versions
+from posts.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Собирает ленты подписок (FeedEntry) заново из Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты пересобрать (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        with use_primary(), transaction.atomic():
+            user_ids = None
+            if options['usernames']:
+                user_ids = list(User.objects.filter(
+                    username__in=options['usernames']
+                ).values_list('pk', flat=True))
+            created = feeds.rebuild(user_ids)
+            if user_ids is None:
+                user_ids = Follow.objects.values_list(
+                    'user_id', flat=True
+                ).distinct()
+            versions.bump(
+                [versions.follow_feed(user_id) for user_id in user_ids]
+            )
+        self.stdout.write(f'Записей в лентах: {created}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.db import use_primary
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=counters.RECONCILE_BATCH
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with use_primary():
+            created = counters.create_missing_stats(batch_size)
+            posts = counters.reconcile_posts(batch_size)
+            users = counters.reconcile_users(batch_size)
+        self.stdout.write(
+            f'Создано профилей счётчиков: {created}, '
+            f'исправлено постов: {posts}, авторов: {users}'
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.db import use_primary
+from posts import feeds
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из лент подписок записи старше FEED_MAX_ENTRIES новейших'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=None,
+            help='Сколько записей оставить каждому пользователю'
+        )
+
+    def handle(self, *args, **options):
+        with use_primary():
+            deleted = feeds.trim(options['keep'])
+        self.stdout.write(f'Удалено записей лент: {deleted}')
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    """
+    Ленты по существующим подпискам: последние FEED_BACKFILL_POSTS
+    постов каждого автора, кроме «знаменитостей» (их посты читаются
+    напрямую), — одним INSERT ... SELECT.
+    """
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} (user_id, post_id) '
+            f'SELECT follow.user_id, post.id '
+            f'FROM {Follow._meta.db_table} follow JOIN ('
+            f'SELECT id, author_id, ROW_NUMBER() OVER ('
+            f'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            f') AS position FROM {Post._meta.db_table}'
+            f') post ON post.author_id = follow.author_id '
+            f'WHERE post.position <= %s AND follow.author_id IN ('
+            f'SELECT author_id FROM {Follow._meta.db_table} '
+            f'GROUP BY author_id HAVING COUNT(*) < %s)',
+            [settings.FEED_BACKFILL_POSTS, settings.FEED_CELEBRITY_FOLLOWERS]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_auto_20220517_2016'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'post')},
+            },
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
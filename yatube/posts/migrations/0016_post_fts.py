@@ -0,0 +1,139 @@
+import re
+from itertools import islice
+
+from django.db import migrations
+
+# Замороженная копия стеммера и terms из posts.search на момент этой
+# миграции: код приложения может измениться, а миграция — нет.
+VOWELS = 'аеиоуыэюя'
+WORD = re.compile(r'\w+')
+BATCH_SIZE = 1000
+
+
+def _ending(group1=(), group2=(), prefix=''):
+    def alternatives(endings):
+        return '|'.join(sorted(endings, key=len, reverse=True))
+
+    parts = []
+    if group1:
+        parts.append(f'(?<=[ая])(?:{alternatives(group1)})')
+    if group2:
+        parts.append(f'(?:{alternatives(group2)})')
+    return re.compile(f'{prefix}(?:{"|".join(parts)})$')
+
+
+PERFECTIVE_GERUND = _ending(
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE_ENDINGS = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = '(?:(?<=[ая])(?:ем|нн|вш|ющ|щ)|ивш|ывш|ующ)?'
+ADJECTIVAL = _ending(group2=ADJECTIVE_ENDINGS, prefix=PARTICIPLE)
+REFLEXIVE = _ending(group2=('ся', 'сь'))
+VERB = _ending(
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = _ending(group2=(
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = _ending(group2=('ейш', 'ейше'))
+DERIVATIONAL = _ending(group2=('ост', 'ость'))
+
+
+def _region(word, start=0):
+    for position in range(start + 1, len(word)):
+        if word[position - 1] in VOWELS and word[position] not in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def _cut(pattern, rv):
+    match = pattern.search(rv)
+    return (rv[:match.start()], True) if match else (rv, False)
+
+
+def stem(word):
+    """Стеммер Портера (Snowball) для русского языка."""
+    word = word.lower().replace('ё', 'е')
+    first_vowel = next(
+        (i for i, letter in enumerate(word) if letter in VOWELS), None
+    )
+    if first_vowel is None:
+        return word
+    prefix, rv = word[:first_vowel + 1], word[first_vowel + 1:]
+    rv, found = _cut(PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = _cut(REFLEXIVE, rv)
+        for pattern in (ADJECTIVAL, VERB, NOUN):
+            rv, found = _cut(pattern, rv)
+            if found:
+                break
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = DERIVATIONAL.search(rv)
+    r2 = _region(prefix + rv, _region(prefix + rv))
+    if match and len(prefix) + match.start() >= r2:
+        rv = rv[:match.start()]
+    rv, found = _cut(SUPERLATIVE, rv)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def terms(text):
+    return [stem(word) for word in WORD.findall(text.lower())]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+        "body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    # Посты читаются потоком и пишутся пачками: в памяти не больше
+    # BATCH_SIZE текстов.
+    rows = Post.objects.using(
+        schema_editor.connection.alias
+    ).values_list('pk', 'text').iterator(chunk_size=BATCH_SIZE)
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = [
+                (pk, ' '.join(terms(text)))
+                for pk, text in islice(rows, BATCH_SIZE)
+            ]
+            if not batch:
+                break
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, body) VALUES (%s, %s)',
+                batch
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.utils.text import Truncator
 
 User = get_user_model()
@@ -26,6 +27,11 @@ class Group(models.Model):
             N_WORDS, truncate=" ...")
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст сообщения',
@@ -53,11 +59,39 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.ImageField(
+        'Миниатюра', upload_to='posts/thumbnails/',
+        blank=True, editable=False
+    )
+    thumbnail_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    thumbnail_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    thumbnail_source = models.CharField(
+        max_length=100, blank=True, editable=False
+    )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+    # Меняется вместе с любым полем, которое видно в карточке поста:
+    # по нему posts.rendering отличает устаревшую разметку в кэше.
+    updated = models.DateTimeField(
+        'Изменён', default=timezone.now, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['author', '-pub_date', '-id']),
+            models.Index(fields=['group', '-pub_date', '-id']),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -88,11 +122,34 @@ class Comment(models.Model):
     class Meta:
         ordering = ('-created',)
         verbose_name_plural = 'Комментарии к постам'
+        indexes = [
+            models.Index(fields=['post', '-created']),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class PendingComment(models.Model):
+    """
+    Комментарий, принятый в режиме COMMENT_QUEUE и ещё не перенесённый
+    в Comment командой flush_comments (posts.comment_queue).
+    """
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='pending_comments'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='pending_comments'
+    )
+    text = models.TextField()
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'author']),
+        ]
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE,
@@ -105,3 +162,36 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ('user', 'author',)
+        indexes = [
+            models.Index(fields=['author', 'user']),
+        ]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Копия Post.pub_date: лента подписок листается по индексу
+    # FeedEntry, без соединения с Post.
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post',)
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post']),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE,
+        primary_key=True, related_name='stats'
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
@@ -0,0 +1,112 @@
+import hashlib
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template import Context
+from django.urls import get_script_prefix, reverse
+from django.utils import timezone, translation
+from django.utils.http import RFC3986_SUBDELIMS
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'includes/post.html'
+CARD_PREFIX = 'post_card:'
+
+# Число-заглушка, которое проходит и int-, и str-конвертеры адресов.
+PLACEHOLDER = '918273645546372819'
+URL_SAFE = RFC3986_SUBDELIMS + '/~:@'
+
+
+@lru_cache(maxsize=None)
+def _url_parts(name, prefix):
+    before, _, after = reverse(name, args=[PLACEHOLDER]).partition(
+        PLACEHOLDER
+    )
+    return before, after
+
+
+def url_for(name, value):
+    """reverse(name, args=[value]) без разбора шаблона адреса."""
+    before, after = _url_parts(name, get_script_prefix())
+    return f'{before}{quote(str(value), safe=URL_SAFE)}{after}'
+
+
+def post_urls(post):
+    urls = {
+        'profile': url_for('posts:profile', post.author.username),
+        'edit': url_for('posts:post_edit', post.pk),
+        'detail': url_for('posts:post_detail', post.pk),
+        'comment': url_for('posts:add_comment', post.pk),
+        'group': None,
+    }
+    if post.group_id:
+        urls['group'] = url_for('posts:group_list', post.group.slug)
+    return urls
+
+
+@lru_cache(maxsize=64)
+def _variant(source, prefix, language, zone):
+    raw = '\0'.join((source, prefix, language or '', zone))
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def variant(template):
+    """
+    Часть ключа, общая для карточек одной страницы: шаблон карточки,
+    префикс адресов, язык и часовой пояс.
+    """
+    return _variant(
+        template.source, get_script_prefix(), translation.get_language(),
+        timezone.get_current_timezone_name(),
+    )
+
+
+def card_key(post, link, variant):
+    return (
+        f'{CARD_PREFIX}{post.pk}:{post.updated.timestamp()}:'
+        f'{int(bool(link))}:{variant}'
+    )
+
+
+class FeedRenderer:
+    """
+    Рендерит карточки всех постов страницы за один вызов.
+
+    Адреса карточки собираются подстановкой в заранее вычисленные
+    шаблоны вместо {% url %}. Готовая разметка хранится в кэше по ключу
+    из id поста и Post.updated, поэтому изменённый пост просто получает
+    новый ключ, а все карточки страницы достаются одним get_many.
+    С debug-шаблонами разметка не кэшируется, чтобы правки
+    includes/post.html были видны сразу.
+    """
+
+    def _render(self, template, post, link):
+        return mark_safe(template.render(Context(
+            {'post': post, 'link': link, 'urls': post_urls(post)},
+            autoescape=template.engine.autoescape,
+        )))
+
+    def render(self, engine, posts, link=False):
+        posts = list(posts)
+        template = engine.get_template(CARD_TEMPLATE)
+        if engine.debug:
+            return [self._render(template, post, link) for post in posts]
+        page_variant = variant(template)
+        keys = [card_key(post, link, page_variant) for post in posts]
+        cards = {
+            key: mark_safe(html)
+            for key, html in cache.get_many(keys).items()
+        }
+        rendered = {
+            key: self._render(template, post, link)
+            for key, post in zip(keys, posts)
+            if key not in cards
+        }
+        if rendered:
+            cache.set_many(rendered, settings.FEED_CARD_TIMEOUT)
+            cards.update(rendered)
+        return [cards[key] for key in keys]
+
+
+renderer = FeedRenderer()
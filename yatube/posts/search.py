@@ -0,0 +1,221 @@
+import abc
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .utils import decode_token, encode_token
+
+VOWELS = 'аеиоуыэюя'
+WORD = re.compile(r'\w+')
+
+
+def _ending(group1=(), group2=(), prefix=''):
+    def alternatives(endings):
+        return '|'.join(sorted(endings, key=len, reverse=True))
+
+    parts = []
+    if group1:
+        parts.append(f'(?<=[ая])(?:{alternatives(group1)})')
+    if group2:
+        parts.append(f'(?:{alternatives(group2)})')
+    return re.compile(f'{prefix}(?:{"|".join(parts)})$')
+
+
+PERFECTIVE_GERUND = _ending(
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE_ENDINGS = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = '(?:(?<=[ая])(?:ем|нн|вш|ющ|щ)|ивш|ывш|ующ)?'
+ADJECTIVAL = _ending(group2=ADJECTIVE_ENDINGS, prefix=PARTICIPLE)
+REFLEXIVE = _ending(group2=('ся', 'сь'))
+VERB = _ending(
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = _ending(group2=(
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = _ending(group2=('ейш', 'ейше'))
+DERIVATIONAL = _ending(group2=('ост', 'ость'))
+
+
+def _region(word, start=0):
+    for position in range(start + 1, len(word)):
+        if word[position - 1] in VOWELS and word[position] not in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def _cut(pattern, rv):
+    match = pattern.search(rv)
+    return (rv[:match.start()], True) if match else (rv, False)
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Стеммер Портера (Snowball) для русского языка."""
+    word = word.lower().replace('ё', 'е')
+    first_vowel = next(
+        (i for i, letter in enumerate(word) if letter in VOWELS), None
+    )
+    if first_vowel is None:
+        return word
+    prefix, rv = word[:first_vowel + 1], word[first_vowel + 1:]
+    rv, found = _cut(PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = _cut(REFLEXIVE, rv)
+        for pattern in (ADJECTIVAL, VERB, NOUN):
+            rv, found = _cut(pattern, rv)
+            if found:
+                break
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = DERIVATIONAL.search(rv)
+    r2 = _region(prefix + rv, _region(prefix + rv))
+    if match and len(prefix) + match.start() >= r2:
+        rv = rv[:match.start()]
+    rv, found = _cut(SUPERLATIVE, rv)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def terms(text):
+    return [stem(word) for word in WORD.findall(text.lower())]
+
+
+class SearchBackend(abc.ABC):
+    """
+    Интерфейс поискового индекса. Реализация выбирается настройкой
+    SEARCH_BACKEND, search возвращает id постов и курсор следующей
+    страницы. index и remove по умолчанию ничего не делают — для
+    бэкендов без своего индекса.
+    """
+
+    def index(self, post):
+        pass
+
+    def index_many(self, posts):
+        for post in posts:
+            self.index(post)
+
+    def remove(self, post_id):
+        pass
+
+    @abc.abstractmethod
+    def search(self, query, limit, cursor=None):
+        """(id постов страницы, курсор следующей страницы или None)."""
+
+
+class SQLiteFTSBackend(SearchBackend):
+    table = 'posts_post_fts'
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(terms(post.text))]
+            )
+
+    def index_many(self, posts):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(post.pk,) for post in posts]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)',
+                [(post.pk, ' '.join(terms(post.text))) for post in posts]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def search(self, query, limit, cursor=None):
+        words = terms(query)
+        if not words:
+            return [], None
+        match = ' '.join(f'"{word}"*' for word in words)
+        sql = (
+            f'SELECT id, score FROM ('
+            f'SELECT rowid AS id, bm25({self.table}) AS score '
+            f'FROM {self.table} WHERE {self.table} MATCH %s)'
+        )
+        params = [match]
+        if cursor is not None and len(cursor) == 2:
+            sql += ' WHERE score > %s OR (score = %s AND id > %s)'
+            params += [cursor[0], cursor[0], cursor[1]]
+        sql += ' ORDER BY score, id LIMIT %s'
+        params.append(limit + 1)
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            last_id, last_score = rows[limit - 1]
+            next_cursor = [last_score, last_id]
+        return [row[0] for row in rows[:limit]], next_cursor
+
+
+class LikeBackend(SearchBackend):
+    """Поиск без индекса для баз без полнотекстового поиска."""
+
+    def search(self, query, limit, cursor=None):
+        words = WORD.findall(query)
+        if not words:
+            return [], None
+        condition = Q()
+        for word in words:
+            condition &= Q(text__icontains=word)
+        posts = Post.objects.filter(condition)
+        if cursor is not None and len(cursor) == 1:
+            posts = posts.filter(pk__lt=cursor[0])
+        ids = list(posts.order_by('-pk').values_list(
+            'pk', flat=True
+        )[:limit + 1])
+        next_cursor = [ids[limit - 1]] if len(ids) > limit else None
+        return ids[:limit], next_cursor
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+def search_posts(query, token=None, limit=None):
+    """Найденные посты в порядке релевантности и курсор продолжения."""
+    limit = limit or settings.SEARCH_PAGE_SIZE
+    cursor = decode_token(token) if token else None
+    if not isinstance(cursor, list) or not all(
+        isinstance(value, (int, float)) for value in cursor
+    ):
+        cursor = None
+    ids, next_cursor = get_backend().search(query, limit, cursor)
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return (
+        [posts[pk] for pk in ids if pk in posts],
+        encode_token(next_cursor) if next_cursor else None,
+    )
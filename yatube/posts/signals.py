@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import tasks as core_tasks
+from core.db import use_primary
+
+from . import counters, follows, tasks, thumbnails, versions
+from .models import Comment, Follow, Group, Post, UserStats
+
+# Поля пользователя, которые видны в карточках его постов.
+AUTHOR_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def _card(user):
+    return tuple(getattr(user, field) for field in sorted(AUTHOR_CARD_FIELDS))
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def user_saving(sender, instance, update_fields, **kwargs):
+    instance._saved_card = None
+    if not instance.pk or update_fields is not None and not (
+        AUTHOR_CARD_FIELDS & set(update_fields)
+    ):
+        return
+    with use_primary():
+        instance._saved_card = sender.objects.filter(
+            pk=instance.pk
+        ).values_list(*sorted(AUTHOR_CARD_FIELDS)).first()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+        return
+    # Полный save() (last_login, set_password) имён обычно не меняет.
+    saved = getattr(instance, '_saved_card', None)
+    if saved is None or saved == _card(instance):
+        return
+    # Имя видно в карточках постов автора и в комментариях к чужим.
+    touched = Post.objects.filter(
+        Q(author=instance) | Q(comments__author=instance)
+    )
+    with use_primary():
+        posts = dict(touched.values_list('pk', 'author_id'))
+    if not posts:
+        return
+    touched.update(updated=timezone.now())
+    feeds = [versions.post_feed(pk) for pk in sorted(posts)]
+    if instance.pk in posts.values():
+        feeds += versions.author_feeds(instance.pk)
+    versions.bump(feeds)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created and Post.objects.filter(group=instance).update(
+        updated=timezone.now()
+    ):
+        versions.bump([versions.global_feed(), versions.group_feed(
+            instance.slug
+        )])
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance.updated = timezone.now()
+    if instance.pk:
+        # Группа до правки: её лента тоже изменится (см. post_saved).
+        with use_primary():
+            instance._saved_group_slug = Post.objects.filter(
+                pk=instance.pk
+            ).values_list('group__slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, post_count=1)
+        core_tasks.enqueue(tasks.fan_out_post, instance.pk)
+    core_tasks.enqueue(
+        tasks.sync_search, instance.pk, key=f'search:{instance.pk}'
+    )
+    if (instance.image.name or '') != instance.thumbnail_source:
+        thumbnails.schedule(instance.pk)
+    versions.bump_post(instance.pk)
+    saved_slug = getattr(instance, '_saved_group_slug', None)
+    group_slug = instance.group.slug if instance.group_id else None
+    if saved_slug and saved_slug != group_slug:
+        versions.bump([versions.group_feed(saved_slug)])
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Записи FeedEntry удаляются каскадом раньше post_delete.
+    group = instance.group if instance.group_id else None
+    instance._deleted_feeds = versions.post_feeds(
+        instance, group.slug if group else None
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, post_count=-1)
+    core_tasks.enqueue(
+        tasks.sync_search, instance.pk, key=f'search:{instance.pk}'
+    )
+    versions.bump(instance._deleted_feeds)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, comment_count=1)
+    else:
+        counters.bump_post(instance.post_id)
+    versions.bump_post(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, comment_count=-1)
+    versions.bump_post(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        follows.on_followed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follows.on_unfollowed(instance.user_id, [instance.author_id])
@@ -0,0 +1,18 @@
+"""Фоновые задачи постов для core.tasks: аргументы — только id."""
+from . import feeds, search, versions
+from .models import Post
+
+
+def fan_out_post(post_id):
+    # Ленты подписчиков изменились только сейчас, а не при сохранении.
+    user_ids = feeds.fan_out_posts([post_id])
+    versions.bump([versions.follow_feed(user_id) for user_id in user_ids])
+
+
+def sync_search(post_id):
+    """Приводит запись поискового индекса к текущему состоянию поста."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        search.get_backend().remove(post_id)
+    else:
+        search.get_backend().index(post)
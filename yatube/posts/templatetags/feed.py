@@ -0,0 +1,19 @@
+from django import template
+
+from posts.rendering import renderer
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def feed_cards(context, posts, link=False):
+    """
+    Готовые карточки постов страницы:
+    {% feed_cards page_obj link=True as cards %}.
+    """
+    return renderer.render(context.template.engine, posts, link)
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, link=False):
+    return renderer.render(context.template.engine, [post], link)[0]
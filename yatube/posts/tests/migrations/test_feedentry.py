@@ -0,0 +1,34 @@
+from .utils import MigrationTestCase
+
+BEFORE = [('posts', '0011_auto_20220517_2016')]
+
+
+class FeedEntryMigrationTest(MigrationTestCase):
+    def test_existing_follows_fill_feeds(self):
+        """Миграция собирает ленты из подписок, которые уже есть в базе."""
+        apps = self.migrate(BEFORE)
+        User = apps.get_model('auth', 'User')
+        Post = apps.get_model('posts', 'Post')
+        Follow = apps.get_model('posts', 'Follow')
+        reader = User.objects.create(username='reader')
+        author = User.objects.create(username='author')
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=reader, author=author)
+        posts = {
+            Post.objects.create(author=author, text=f'Пост {number}').pk
+            for number in range(3)
+        }
+        Post.objects.create(author=other, text='Чужой')
+
+        apps = self.migrate()
+        FeedEntry = apps.get_model('posts', 'FeedEntry')
+        Post = apps.get_model('posts', 'Post')
+        self.assertEqual(
+            set(FeedEntry.objects.values_list(
+                'user_id', 'post_id', 'pub_date'
+            )),
+            {
+                (reader.pk, pk, Post.objects.get(pk=pk).pub_date)
+                for pk in posts
+            }
+        )
@@ -0,0 +1,35 @@
+from importlib import import_module
+from unittest import mock, skipUnless
+
+from django.db import connection
+
+from .utils import MigrationTestCase
+
+BEFORE = [('posts', '0015_post_thumbnail')]
+MIGRATION = import_module('posts.migrations.0016_post_fts')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'индекс FTS5 есть только в SQLite')
+class PostFTSMigrationTest(MigrationTestCase):
+    def test_existing_posts_indexed_in_batches(self):
+        """Миграция индексирует все посты, читая их пачками."""
+        apps = self.migrate(BEFORE)
+        User = apps.get_model('auth', 'User')
+        Post = apps.get_model('posts', 'Post')
+        author = User.objects.create(username='author')
+        posts = {
+            Post.objects.create(author=author, text=f'Котики {number}').pk
+            for number in range(5)
+        }
+        with mock.patch.object(MIGRATION, 'BATCH_SIZE', 2):
+            self.migrate()
+        with connection.cursor() as cursor:
+            # Таблицу FTS5 flush не очищает.
+            self.addCleanup(
+                connection.cursor().execute, 'DELETE FROM posts_post_fts'
+            )
+            cursor.execute(
+                'SELECT rowid FROM posts_post_fts '
+                'WHERE posts_post_fts MATCH %s', [MIGRATION.stem('котики')]
+            )
+            self.assertEqual({row[0] for row in cursor.fetchall()}, posts)
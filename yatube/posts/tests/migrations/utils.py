@@ -0,0 +1,20 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Переводит базу на нужные миграции; в конце — снова на последние."""
+
+    def migrate(self, targets=None):
+        """Без targets — на последние миграции. Возвращает их apps."""
+        executor = MigrationExecutor(connection)
+        if targets is None:
+            targets = executor.loader.graph.leaf_nodes()
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate()
+        super().tearDown()
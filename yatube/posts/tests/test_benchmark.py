@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from posts import benchmark, urls
+from posts.models import Comment, FeedEntry, Follow, Post, UserStats
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_data', users=5, groups=2, posts=30, comments=20,
+            follows=6, stdout=StringIO()
+        )
+
+    def test_seed_data(self):
+        """seed_data создаёт данные и заполняет счётчики и ленты."""
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertEqual(Follow.objects.count(), 6)
+        self.assertEqual(UserStats.objects.count(), 5)
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_benchmark_views(self):
+        """benchmark_views замеряет все страницы и сохраняет планы."""
+        output = os.path.join(tempfile.mkdtemp(), 'result.json')
+        call_command(
+            'benchmark_views', repeat=1, output=output, stdout=StringIO()
+        )
+        with open(output) as result:
+            results = json.load(result)
+        self.assertEqual(
+            set(results),
+            {'index', 'index_last_page', 'group_posts', 'profile',
+             'post_detail', 'follow_index'}
+        )
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertEqual(result['status'], 200)
+                self.assertTrue(result['plans'])
+        results['index']['queries'] = 0
+        with open(output, 'w') as baseline:
+            json.dump(results, baseline)
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_views', repeat=1, baseline=output,
+                tolerance=100, stdout=StringIO()
+            )
+
+    def test_benchmark_concurrency(self):
+        """benchmark_concurrency сообщает пропускную способность."""
+        output = os.path.join(tempfile.mkdtemp(), 'result.json')
+        call_command(
+            'benchmark_concurrency', readers=0, writers=0, duration=0,
+            output=output, stdout=StringIO()
+        )
+        with open(output) as result:
+            results = json.load(result)
+        self.assertEqual(set(results), {'read', 'write'})
+        self.assertEqual(results['read']['requests'], 0)
+        self.assertIsNone(results['read']['p95_ms'])
+
+    def test_benchmark_templates(self):
+        """benchmark_templates рендерит ленту в обоих режимах загрузчика."""
+        output = os.path.join(tempfile.mkdtemp(), 'result.json')
+        call_command(
+            'benchmark_templates', repeat=2, output=output, stdout=StringIO()
+        )
+        with open(output) as result:
+            results = json.load(result)
+        self.assertEqual(set(results), set(benchmark.TEMPLATE_MODES))
+        for mode, result in results.items():
+            with self.subTest(mode=mode):
+                self.assertEqual(result['posts'], 10)
+                self.assertIsNotNone(result['median_ms'])
+
+    def test_load_test_covers_all_routes(self):
+        """load_test проходит все маршруты posts/urls.py без ошибок."""
+        routes = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(
+            {entry[1] for entry in benchmark.route_urls()}, routes
+        )
+        output = os.path.join(tempfile.mkdtemp(), 'result.json')
+        call_command(
+            'load_test', concurrency=1, requests=2, output=output,
+            stdout=StringIO()
+        )
+        with open(output) as result:
+            results = json.load(result)
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertEqual(result['requests'], 2)
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['queries'], 0)
+
+    def test_load_test_thresholds(self):
+        """Превышение порога p99 завершает прогон ошибкой."""
+        with self.assertRaises(CommandError):
+            call_command(
+                'load_test', concurrency=1, requests=1, max_p99=0,
+                stdout=StringIO()
+            )
+
+    def test_compare(self):
+        """Регрессия фиксируется при росте времени или числа запросов."""
+        baseline = {'index': {'median_ms': 10, 'queries': 3}}
+        self.assertEqual(benchmark.compare(
+            baseline, {'index': {'median_ms': 11, 'queries': 3}}
+        ), [])
+        self.assertEqual(len(benchmark.compare(
+            baseline, {'index': {'median_ms': 20, 'queries': 4}}
+        )), 2)
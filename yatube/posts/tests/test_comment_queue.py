@@ -0,0 +1,105 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from posts import comment_queue
+from posts.models import Comment, PendingComment, Post
+
+from core.tests.utils import LaggingReplicaMixin
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_QUEUE=True)
+class CommentQueueTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.url = reverse('posts:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_author_sees_pending(self):
+        """Свой комментарий виден автору сразу, остальным — после flush."""
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'В очереди'}
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(self.reader_client.get(self.url), 'В очереди')
+        self.assertNotContains(self.guest_client.get(self.url), 'В очереди')
+        call_command('flush_comments', stdout=StringIO())
+        self.assertFalse(PendingComment.objects.exists())
+        response = self.guest_client.get(self.url)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['В очереди']
+        )
+        self.assertEqual(response.context['post'].comment_count, 1)
+
+    def test_pending_revalidated(self):
+        """После комментария в очередь старый ETag страницы не годится."""
+        etag = self.reader_client.get(self.url)['ETag']
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'В очереди'}
+        )
+        response = self.reader_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'В очереди')
+
+    def test_flush_batches(self):
+        """Очередь переносится пачками в исходном порядке и времени."""
+        other = Post.objects.create(author=self.author, text='Другой')
+        pending = [
+            PendingComment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {number}'
+            ) for number, post in enumerate([self.post, other, self.post])
+        ]
+        call_command('flush_comments', batch_size=2, stdout=StringIO())
+        comments = list(Comment.objects.order_by('pk'))
+        self.assertEqual(
+            [(comment.post_id, comment.text, comment.created)
+             for comment in comments],
+            [(item.post_id, item.text, item.created) for item in pending]
+        )
+        counts = dict(Post.objects.values_list('pk', 'comment_count'))
+        self.assertEqual(counts, {self.post.pk: 2, other.pk: 1})
+
+    def test_api_accepts(self):
+        """API отвечает 202 и кладёт комментарий в очередь."""
+        response = self.reader_client.post(
+            reverse('api:comments', args=[self.post.pk]),
+            json.dumps({'text': 'Из API'}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.json()['pending'])
+        self.assertEqual(PendingComment.objects.get().text, 'Из API')
+
+
+class CommentQueueReplicaTest(LaggingReplicaMixin, TransactionTestCase):
+    def test_flush_reads_primary(self):
+        """Отстающая реплика не заставляет перенести комментарий дважды."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        for number in range(3):
+            comment_queue.enqueue(post.pk, author, f'Комментарий {number}')
+        self.sync()
+        self.assertEqual(comment_queue.flush(batch_size=2), 3)
+        self.assertEqual(Comment.objects.using('default').count(), 3)
+        self.assertFalse(PendingComment.objects.using('default').exists())
+        self.assertEqual(
+            PendingComment.objects.using(self.replica).count(), 3
+        )
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PAGE_SIZE=2)
+class CommentPageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            ) for number in range(3)
+        ]
+        cls.url = reverse('posts:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_pages(self):
+        """Комментарии выводятся страницами от новых к старым."""
+        response = self.guest_client.get(self.url)
+        self.assertEqual(
+            response.context['comments'], self.comments[:0:-1]
+        )
+        cursor = response.context['comments_cursor']
+        self.assertContains(response, f'?comments={cursor}')
+        response = self.guest_client.get(self.url, {'comments': cursor})
+        self.assertEqual(response.context['comments'], [self.comments[0]])
+        self.assertIsNone(response.context['comments_cursor'])
+        response = self.guest_client.get(self.url, {'comments': 'bad'})
+        self.assertEqual(
+            response.context['comments'], self.comments[:0:-1]
+        )
+
+    def test_first_page_cached(self):
+        """Первая страница берётся из кэша до нового комментария."""
+        self.guest_client.get(self.url)
+        Comment.objects.filter(pk=self.comments[2].pk).update(text='Мимо')
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Комментарий 2')
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Свежий'}
+        )
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Свежий')
+        self.assertContains(response, 'Мимо')
+
+    def test_newer_comments(self):
+        """API отдаёт только комментарии новее указанного."""
+        response = self.guest_client.get(
+            reverse('api:comments', args=[self.post.pk]),
+            {'after': self.comments[0].pk}
+        )
+        self.assertEqual(
+            [comment['id'] for comment in response.json()['results']],
+            [comment.pk for comment in self.comments[1:]]
+        )
@@ -0,0 +1,84 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_post_count(self):
+        """Счётчик постов автора меняется при создании и удалении."""
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.post_count, 1)
+        post = Post.objects.create(author=self.author, text='Ещё текст')
+        stats.refresh_from_db()
+        self.assertEqual(stats.post_count, 2)
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.post_count, 1)
+
+    def test_comment_count(self):
+        """Счётчик комментариев поста растёт после add_comment."""
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_follow_counts(self):
+        """Счётчики подписок и подписчиков."""
+        follow = reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}
+        )
+        unfollow = reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}
+        )
+        self.reader_client.get(follow)
+        self.reader_client.get(follow)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).follower_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+        self.reader_client.get(unfollow)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).follower_count, 0
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 0
+        )
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Comment.objects.create(post=self.post, author=self.reader, text='1')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        UserStats.objects.filter(user=self.author).update(
+            post_count=0, follower_count=5
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        author_stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(author_stats.post_count, 1)
+        self.assertEqual(author_stats.follower_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
@@ -0,0 +1,111 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from posts import follows
+from posts.feeds import FollowFeed
+from posts.models import FeedEntry, Post
+from posts.utils import CURSOR_NEXT, CursorPaginator
+
+User = get_user_model()
+
+
+@override_settings(FEED_CELEBRITY_FOLLOWERS=2)
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cache.clear()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.regular = User.objects.create_user(username='regular')
+        cls.star = User.objects.create_user(username='star')
+        other = User.objects.create_user(username='other')
+        follows.follow(cls.reader, [cls.regular.pk, cls.star.pk])
+        follows.follow(other, [cls.star.pk])
+        for number in range(4):
+            Post.objects.create(author=cls.regular, text=f'Обычный {number}')
+            Post.objects.create(author=cls.star, text=f'Звезда {number}')
+            Post.objects.create(author=other, text=f'Чужой {number}')
+        cls.expected = list(Post.objects.filter(
+            author__in=[cls.regular, cls.star]
+        ).order_by('-pub_date', '-pk').values_list('pk', flat=True))
+
+    def feed(self):
+        return FollowFeed(self.reader, [self.star.pk])
+
+    def test_cursor_pages_merge_entries_and_celebrities(self):
+        """Курсор листает слитые записи FeedEntry и посты «звезды»."""
+        self.assertEqual(
+            FeedEntry.objects.filter(post__author=self.star).count(), 0
+        )
+        pages, token = [], None
+        while True:
+            paginator = CursorPaginator(self.feed(), 3)
+            page = paginator.cursor_page(token)
+            pages.append([post.pk for post in page])
+            token = paginator.next_cursor
+            if token is None:
+                break
+        self.assertEqual(sum(pages, []), self.expected)
+        first = CursorPaginator(self.feed(), 3)
+        first.cursor_page()
+        second = CursorPaginator(self.feed(), 3)
+        second.cursor_page(first.next_cursor)
+        previous = CursorPaginator(self.feed(), 3).cursor_page(
+            second.previous_cursor
+        )
+        self.assertEqual([post.pk for post in previous], pages[0])
+
+    def test_numbered_pages(self):
+        """Для ?page= лента считается и режется как выборка Post."""
+        feed = self.feed()
+        self.assertEqual(feed.count(), len(self.expected))
+        self.assertEqual(
+            [post.pk for post in feed[2:5]], self.expected[2:5]
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'план запроса SQLite')
+    def test_entries_use_index_without_sort(self):
+        """Окно FeedEntry читается по индексу, без временной сортировки."""
+        cursor = (CURSOR_NEXT, timezone.now(), 10 ** 9)
+        sql, params = self.feed().entries(cursor)[:10].query.sql_with_params()
+        with connection.cursor() as db_cursor:
+            db_cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row[-1]) for row in db_cursor.fetchall())
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertIn('posts_feede_user_id_cbce2a_idx', plan)
+
+    def test_trim_feeds(self):
+        """trim_feeds оставляет каждому только новейшие записи."""
+        newest = list(FeedEntry.objects.filter(
+            user=self.reader
+        ).order_by('-pub_date', '-post_id').values_list('post_id', flat=True))
+        call_command('trim_feeds', keep=2, stdout=StringIO())
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.reader).order_by(
+                '-pub_date', '-post_id'
+            ).values_list('post_id', flat=True)),
+            newest[:2]
+        )
+
+    def test_rebuild_feeds(self):
+        """rebuild_feeds восстанавливает потерянные записи лент."""
+        entries = set(FeedEntry.objects.values_list(
+            'user_id', 'post_id', 'pub_date'
+        ))
+        FeedEntry.objects.filter(user=self.reader).delete()
+        call_command('rebuild_feeds', 'reader', stdout=StringIO())
+        self.assertEqual(
+            set(FeedEntry.objects.values_list(
+                'user_id', 'post_id', 'pub_date'
+            )),
+            entries
+        )
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(FeedEntry.objects.count(), len(entries))
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from posts.feeds import followed_celebrities
+from posts.following import following_ids, is_following
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowingCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_reader(self):
+        return User.objects.get(pk=self.reader.pk)
+
+    def test_cached(self):
+        """Список подписок читается из кэша без запросов к базе."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        following_ids(self.fresh_reader())
+        reader = self.fresh_reader()
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(reader, self.authors[0].pk))
+            self.assertFalse(is_following(reader, self.authors[1].pk))
+
+    def test_invalidated(self):
+        """Подписка и отписка сразу меняют кэшированный список."""
+        self.assertEqual(following_ids(self.fresh_reader()), frozenset())
+        follow = Follow.objects.create(
+            user=self.reader, author=self.authors[1]
+        )
+        self.assertEqual(
+            following_ids(self.fresh_reader()), {self.authors[1].pk}
+        )
+        follow.delete()
+        self.assertEqual(following_ids(self.fresh_reader()), frozenset())
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1)
+    def test_celebrities(self):
+        """Без подписок «знаменитости» не запрашиваются из базы."""
+        following_ids(self.fresh_reader())
+        reader = self.fresh_reader()
+        with self.assertNumQueries(0):
+            self.assertEqual(list(followed_celebrities(reader)), [])
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertEqual(
+            list(followed_celebrities(self.fresh_reader())),
+            [self.authors[0].pk]
+        )
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from posts import follows
+from posts.following import following_ids
+from posts.models import Follow, UserStats
+
+User = get_user_model()
+
+
+class FollowServiceTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        cls.author_ids = [author.pk for author in cls.authors]
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        return dict(UserStats.objects.values_list('user_id', 'follower_count'))
+
+    def check_batch(self):
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(following_ids(reader), frozenset())
+        added = follows.follow(
+            reader, self.author_ids + [self.reader.pk, 999, self.author_ids[0]]
+        )
+        self.assertEqual(sorted(added), self.author_ids)
+        self.assertEqual(following_ids(reader), set(self.author_ids))
+        self.assertEqual(follows.follow(reader, self.author_ids), [])
+        self.assertEqual(Follow.objects.count(), 3)
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(stats.following_count, 3)
+        self.assertEqual(
+            [self.counts()[pk] for pk in self.author_ids], [1, 1, 1]
+        )
+        removed = follows.unfollow(reader, self.author_ids[:2] + [999])
+        self.assertEqual(sorted(removed), self.author_ids[:2])
+        self.assertEqual(follows.unfollow(reader, self.author_ids[:2]), [])
+        self.assertEqual(following_ids(reader), {self.author_ids[2]})
+        stats.refresh_from_db()
+        self.assertEqual(stats.following_count, 1)
+        self.assertEqual(
+            [self.counts()[pk] for pk in self.author_ids], [0, 0, 1]
+        )
+
+    def test_batch(self):
+        """Пакетная подписка и отписка считают только реальные изменения."""
+        self.check_batch()
+
+    def test_batch_without_returning(self):
+        """Без RETURNING результат тот же, по запросу на автора."""
+        with mock.patch(
+            'posts.follows.supports_returning', return_value=False
+        ):
+            self.check_batch()
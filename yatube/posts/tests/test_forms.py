@@ -1,12 +1,22 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from posts.forms import PostForm, CommentForm
 from posts.models import Group, Post
 
+from PIL import Image
+
 User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class TestCreateForm(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -30,6 +40,11 @@ class TestCreateForm(TestCase):
 
         cls.form = PostForm()
 
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
     def setUp(self):
         self.guest_client = Client()
         self.user = User.objects.create_user(username='New User')
@@ -146,3 +161,32 @@ class TestCreateForm(TestCase):
         form_data = {'text': 'Новый комментарий'}
         form = CommentForm(data=form_data)
         self.assertTrue(form.is_valid())
+
+    def make_image(self, size):
+        buffer = BytesIO()
+        Image.new('RGB', size).save(buffer, 'PNG')
+        return SimpleUploadedFile(
+            'big.png', buffer.getvalue(), content_type='image/png'
+        )
+
+    def test_image_size_limits(self):
+        """Слишком большие картинки отклоняются до полного декодирования."""
+        cases = (
+            ({'POST_IMAGE_MAX_BYTES': 10}, 'too_large'),
+            ({'POST_IMAGE_MAX_SIDE': 50}, 'too_many_pixels'),
+        )
+        posts_count = Post.objects.count()
+        for limits, code in cases:
+            with self.subTest(code=code), override_settings(**limits):
+                response = self.authorized_client.post(
+                    reverse('posts:post_create'),
+                    {'text': 'Текст', 'image': self.make_image((100, 20))}
+                )
+                errors = response.context['form'].errors.as_data()
+                self.assertEqual(errors['image'][0].code, code)
+        self.assertEqual(Post.objects.count(), posts_count)
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Текст', 'image': self.make_image((100, 20))}
+        )
+        self.assertEqual(Post.objects.count(), posts_count + 1)
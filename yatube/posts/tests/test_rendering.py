@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import versions
+from posts.models import Comment, Group, Post
+from posts.rendering import renderer, url_for
+
+User = get_user_model()
+
+
+class FeedRendererTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Вася.п@+-')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Первая <b>версия</b>'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_url_for(self):
+        """Заготовки адресов дают то же, что reverse."""
+        urls = (
+            ('posts:profile', self.user.username),
+            ('posts:post_edit', self.post.pk),
+            ('posts:group_list', self.group.slug),
+        )
+        for name, value in urls:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    url_for(name, value), reverse(name, args=[value])
+                )
+
+    def test_card_links(self):
+        """Карточка в ленте содержит все ссылки поста, текст экранирован."""
+        response = self.guest_client.get(reverse('posts:index'))
+        expected = (
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_edit', args=[self.post.pk]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:add_comment', args=[self.post.pk]),
+            reverse('posts:group_list', args=[self.group.slug]),
+            'Первая &lt;b&gt;версия&lt;/b&gt;',
+        )
+        for fragment in expected:
+            with self.subTest(fragment=fragment):
+                self.assertContains(response, fragment)
+
+    def render_card(self):
+        engine = engines.all()[0].engine
+        post = Post.objects.for_feed().get(pk=self.post.pk)
+        return renderer.render(engine, [post])[0]
+
+    def test_card_cached(self):
+        """Карточка берётся из кэша, пока пост не изменился."""
+        self.render_card()
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
+        self.assertIn('Первая', self.render_card())
+
+    def test_card_invalidation(self):
+        """Карточка обновляется после правки поста, комментария, смены
+        имени автора и slug группы."""
+        self.render_card()
+        self.guest_client.get(reverse('posts:index'))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Вторая версия'
+        post.save()
+        self.assertIn('Вторая версия', self.render_card())
+        Comment.objects.create(post=post, author=self.user, text='Ответ')
+        self.assertIn('Комментариев: 1', self.render_card())
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Василий'
+        author.save()
+        self.assertIn('Василий', self.render_card())
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), 'Василий'
+        )
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertIn('/group/new-slug/', renderer.render(
+            engines.all()[0].engine,
+            [Post.objects.for_feed().get(pk=self.post.pk)], link=True
+        )[0])
+
+    def test_login_keeps_cards(self):
+        """Вход пользователя не сбрасывает карточки его постов."""
+        updated = Post.objects.get(pk=self.post.pk).updated
+        self.guest_client.force_login(self.user)
+        author = User.objects.get(pk=self.user.pk)
+        author.set_password('secret')
+        author.save(update_fields=['password'])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).updated, updated)
+
+    def test_full_save_without_rename_keeps_cards(self):
+        """Полный save() без смены имени не трогает посты и версии лент."""
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        updated = Post.objects.get(pk=self.post.pk).updated
+        feeds = versions.author_feeds(self.user.pk) + [
+            versions.post_feed(self.post.pk)
+        ]
+        before, _ = versions.get_state(feeds)
+        author = User.objects.get(pk=self.user.pk)
+        author.set_password('secret')
+        with self.assertNumQueries(2):
+            author.save()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).updated, updated)
+        self.assertEqual(versions.get_state(feeds)[0], before)
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from posts.models import Post
+from posts.search import SearchBackend, search_posts, stem
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки любят спать на солнце'
+        )
+        cls.cat = Post.objects.create(
+            author=cls.user, text='Кошка. Кошку кормили кошачьим кормом'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки громко лаяли во дворе'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_stem(self):
+        """Стеммер приводит словоформы к общей основе."""
+        words = (
+            ('кошки', 'кошк'), ('кошкой', 'кошк'), ('лаяли', 'лая'),
+            ('красивейший', 'красив'), ('ёлки', 'елк'), ('django', 'django'),
+        )
+        for word, expected in words:
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_backend_requires_search(self):
+        """Бэкенд без search нельзя создать."""
+        class Incomplete(SearchBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_search_by_word_forms(self):
+        """Поиск находит посты по другим формам слова, лучшие — первыми."""
+        posts, _ = search_posts('кошкам')
+        self.assertEqual(posts, [self.cat, self.cats])
+        posts, _ = search_posts('собака во дворе')
+        self.assertEqual(posts, [self.dogs])
+
+    def test_index_updated_on_save_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        dogs = Post.objects.get(pk=self.dogs.pk)
+        dogs.text = 'Коты громко мяукали'
+        dogs.save()
+        self.assertEqual(search_posts('собаки')[0], [])
+        self.assertEqual(search_posts('мяукать')[0], [dogs])
+        dogs.delete()
+        self.assertEqual(search_posts('мяукать')[0], [])
+
+    @override_settings(SEARCH_PAGE_SIZE=1)
+    def test_search_page(self):
+        """Страница поиска листается курсором."""
+        url = reverse('posts:search')
+        response = self.guest_client.get(url, {'q': 'кошка'})
+        self.assertEqual(response.context['posts'], [self.cat])
+        response = self.guest_client.get(url, {
+            'q': 'кошка', 'cursor': response.context['next_cursor']
+        })
+        self.assertEqual(response.context['posts'], [self.cats])
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertContains(
+            self.guest_client.get(url, {'q': 'жираф'}), 'Ничего не найдено'
+        )
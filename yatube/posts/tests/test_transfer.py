@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from posts import search, transfer, versions
+from posts.models import (
+    Comment, FeedEntry, Follow, Group, Post, User, UserStats
+)
+
+from core.tests.utils import LaggingReplicaMixin
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group if number % 2 else None,
+                text=f'Запись номер {number}\nс переносом, "кавычками"'
+            ) for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def snapshot(self):
+        return {
+            'groups': list(Group.objects.values_list(
+                'id', 'slug', 'title', 'description'
+            )),
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'id', 'author__username', 'group__slug', 'text', 'pub_date',
+                'comment_count'
+            )),
+            'comments': list(Comment.objects.values_list(
+                'id', 'post_id', 'author__username', 'text', 'created'
+            )),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        }
+
+    def round_trip(self, extension):
+        before = self.snapshot()
+        paths = {}
+        for kind in ('groups', 'posts', 'comments', 'follows'):
+            paths[kind] = os.path.join(self.directory, kind + extension)
+            call_command(
+                'export_data', kind, paths[kind], batch_size=2,
+                stderr=StringIO()
+            )
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.all().delete()
+        for kind, path in paths.items():
+            call_command(
+                'import_data', kind, path, batch_size=2,
+                stdout=StringIO(), stderr=StringIO()
+            )
+        self.assertEqual(self.snapshot(), before)
+        author = User.objects.get(username='author')
+        self.assertEqual(UserStats.objects.get(user=author).post_count, 5)
+        self.assertEqual(FeedEntry.objects.count(), 5)
+        posts, _ = search.search_posts('переносом')
+        self.assertEqual(len(posts), 5)
+        self.assertFalse(any(
+            name.endswith('.checkpoint') for name in os.listdir(self.directory)
+        ))
+
+    def test_round_trip_ndjson(self):
+        """Выгрузка и загрузка NDJSON сохраняют данные и даты."""
+        self.round_trip('.ndjson')
+
+    def test_round_trip_csv(self):
+        """Выгрузка и загрузка CSV сохраняют данные и даты."""
+        self.round_trip('.csv')
+
+    def test_resume_from_checkpoint(self):
+        """Повторный запуск продолжает с контрольной точки."""
+        path = os.path.join(self.directory, 'posts.ndjson')
+        call_command('export_data', 'posts', path, stderr=StringIO())
+        Post.objects.all().delete()
+        with open(transfer.checkpoint_path(path), 'w') as checkpoint:
+            checkpoint.write('{"rows": 3}')
+        loaded = transfer.import_rows('posts', path, 'ndjson', batch_size=2)
+        self.assertEqual(loaded, 2)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)),
+            [post.pk for post in self.posts[3:]]
+        )
+        self.assertFalse(os.path.exists(transfer.checkpoint_path(path)))
+
+    def test_kind_requires_load(self):
+        """Вид данных без load нельзя создать."""
+        class Incomplete(transfer.Kind):
+            model = Group
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_import_bumps_feeds_without_clearing_cache(self):
+        """Загрузка меняет версии своих лент и не чистит весь кэш."""
+        path = os.path.join(self.directory, 'posts.ndjson')
+        call_command('export_data', 'posts', path, stderr=StringIO())
+        Post.objects.all().delete()
+        feeds = [
+            versions.global_feed(), versions.group_feed(self.group.slug)
+        ]
+        before, _ = versions.get_state(feeds)
+        cache.set('unrelated', 1)
+        transfer.import_rows('posts', path, 'ndjson')
+        after, _ = versions.get_state(feeds)
+        for feed in feeds:
+            self.assertNotEqual(after[feed], before[feed])
+        self.assertEqual(cache.get('unrelated'), 1)
+
+    def test_import_skips_existing_posts(self):
+        """Пост с уже занятым id не попадает в поиск и ленты."""
+        post = self.posts[0]
+        path = os.path.join(self.directory, 'posts.ndjson')
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write(
+                f'{{"id": {post.pk}, "author": "author", "group": null, '
+                f'"text": "Подменённый", '
+                f'"pub_date": "2020-01-01T00:00:00+00:00", "image": ""}}\n'
+            )
+        entries = FeedEntry.objects.count()
+        for returning in (True, False):
+            with self.subTest(returning=returning), mock.patch(
+                'posts.transfer.supports_returning', return_value=returning
+            ):
+                self.assertEqual(
+                    transfer.import_rows('posts', path, 'ndjson'), 1
+                )
+                self.assertEqual(Post.objects.get(pk=post.pk).text, post.text)
+                self.assertEqual(search.search_posts('Подменённый')[0], [])
+                self.assertEqual(
+                    [found.pk for found in search.search_posts('номер 0')[0]],
+                    [post.pk]
+                )
+                self.assertEqual(FeedEntry.objects.count(), entries)
+
+
+class TransferReplicaTest(LaggingReplicaMixin, TransactionTestCase):
+    def test_import_reads_primary(self):
+        """Новые авторы пачки ищутся в основной базе, а не в реплике."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'posts.ndjson')
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write(
+                '{"id": 1, "author": "newcomer", "group": null, '
+                '"text": "Запись", "pub_date": "2020-01-01T00:00:00+00:00", '
+                '"image": ""}\n'
+            )
+        self.assertEqual(transfer.import_rows('posts', path, 'ndjson'), 1)
+        self.assertTrue(Post.objects.using('default').filter(
+            author__username='newcomer'
+        ).exists())
@@ -1,13 +1,22 @@
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
-from django.test import TestCase, Client, override_settings
+from django.db import connection, transaction
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
-from posts.models import Group, Post, Follow, Comment
+from posts import thumbnails, versions
+from posts.models import Group, Post, Follow, Comment, FeedEntry
+import os
 import tempfile
 import shutil
+from io import BytesIO
 from django.conf import settings
+from PIL import Image
+
+from core.tests.utils import LaggingReplicaMixin
 
 User = get_user_model()
 COUNT_POSTS = 12
@@ -68,6 +77,7 @@ class YatubePagesTests(TestCase):
         super().tearDownClass()
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -179,6 +189,54 @@ class YatubePagesTests(TestCase):
         self.assertEqual(post.text, 'Текст')
         self.assertContains(response, 'image')
 
+    def test_thumbnail_precomputed(self):
+        """Миниатюра строится заранее и выводится без sorl в шаблоне."""
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=small_gif,
+            content_type='image/gif'
+        )
+        post = Post.objects.create(
+            author=self.user, text='Текст', image=uploaded
+        )
+        self.assertFalse(post.thumbnail)
+        response = self.guest_client.get(self.url_profile)
+        self.assertContains(response, post.image.url)
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.thumbnail_width, post.thumbnail_height), (960, 339)
+        )
+        self.assertEqual(post.thumbnail_source, post.image.name)
+        response = self.guest_client.get(self.url_profile)
+        self.assertContains(response, post.thumbnail.url)
+
+    def test_image_compacted_without_metadata(self):
+        """Картинка перекодируется в компактный формат без EXIF."""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        Image.new('RGB', (4, 4)).save(buffer, 'JPEG', exif=exif)
+        post = Post.objects.create(
+            author=self.user, text='Текст',
+            image=SimpleUploadedFile('photo.jpeg', buffer.getvalue())
+        )
+        thumbnails.compact(post.pk)
+        post.refresh_from_db()
+        self.assertIn(
+            os.path.splitext(post.image.name)[1], ('.webp', '.jpg')
+        )
+        with post.image.open('rb') as source, Image.open(source) as image:
+            self.assertNotIn('exif', image.info)
+
     def test_post_detail_pages_show_correct_context(self):
         """
         Шаблон post_detail сформирован с правильным контекстом.
@@ -308,6 +366,82 @@ class YatubePagesTests(TestCase):
                     )
                     self.assertEqual(len(response.context['page_obj']), count)
 
+    def test_cursor_paginator_on_pages(self):
+        """Проверка пагинации по курсору вперёд и назад."""
+        posts = [
+            Post(
+                author=self.user, text=f'Пост {i}', group=self.group
+            ) for i in range(COUNT_POSTS)
+        ]
+        Post.objects.bulk_create(posts)
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        list_urls = tuple((self.url_index, self.url_group, self.url_profile,))
+        for reverse_name in list_urls:
+            with self.subTest(reverse_name=reverse_name):
+                response = self.guest_client.get(reverse_name)
+                first_page = response.context['page_obj']
+                self.assertEqual(
+                    [post.pk for post in first_page], expected[:10]
+                )
+                self.assertIsNone(first_page.paginator.previous_cursor)
+                response = self.guest_client.get(
+                    reverse_name,
+                    {'cursor': first_page.paginator.next_cursor}
+                )
+                second_page = response.context['page_obj']
+                self.assertEqual(
+                    [post.pk for post in second_page], expected[10:]
+                )
+                self.assertIsNone(second_page.paginator.next_cursor)
+                response = self.guest_client.get(
+                    reverse_name,
+                    {'cursor': second_page.paginator.previous_cursor}
+                )
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    expected[:10]
+                )
+
+    def test_cursor_paginator_broken_cursor(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            self.url_index, {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.context['page_obj'][0], self.post)
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        Follow.objects.create(user=self.user_follower, author=self.user)
+        list_urls = (
+            (self.guest_client, self.url_index),
+            (self.guest_client, self.url_group),
+            (self.guest_client, self.url_profile),
+            (self.client_auth_follower, reverse('posts:follow_index')),
+        )
+
+        def count_queries(client, url):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                client.get(url)
+            return len(context)
+
+        small = {url: count_queries(client, url) for client, url in list_urls}
+        for post in Post.objects.all():
+            Comment.objects.create(post=post, author=self.user, text='Да')
+        for i in range(COUNT_POSTS):
+            Post.objects.create(
+                author=self.user, text='Текст', group=self.group
+            )
+        for post in Post.objects.all():
+            Comment.objects.create(post=post, author=self.user, text='Да')
+        for client, url in list_urls:
+            with self.subTest(url=url):
+                self.assertEqual(count_queries(client, url), small[url])
+
     def test_only_authorized_user_add_comment(self):
         """Только авторизованный пользователь может добавлять комментарии."""
         comments_count = Comment.objects.count()
@@ -367,14 +501,237 @@ class YatubePagesTests(TestCase):
         self.assertTrue(self.author, self.user_following)
         self.assertTrue(self.user, self.user_follower)
 
+    def test_subscription_feed_materialized(self):
+        """Посты раскладываются по лентам при публикации и подписке."""
+        old_post = Post.objects.create(
+            author=self.user_following, text='Старая запись'
+        )
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        new_post = Post.objects.create(
+            author=self.user_following, text='Новая запись'
+        )
+        self.assertEqual(
+            set(FeedEntry.objects.filter(
+                user=self.user_follower
+            ).values_list('post', flat=True)),
+            {old_post.pk, new_post.pk}
+        )
+        Follow.objects.filter(
+            user=self.user_follower, author=self.user_following
+        ).delete()
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.user_follower).exists()
+        )
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1)
+    def test_subscription_feed_celebrity_fan_out_on_read(self):
+        """Посты «знаменитостей» читаются напрямую, без раскладки."""
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        post = Post.objects.create(
+            author=self.user_following, text='Запись знаменитости'
+        )
+        self.assertFalse(FeedEntry.objects.exists())
+        response = self.client_auth_follower.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(response.context['page_obj'][0], post)
+
     def test_cache_index_test(self):
         """Тест кэширования страницы index.html."""
         first_state = self.authorized_client.get(reverse('posts:index'))
-        post_1 = Post.objects.get(pk=1)
-        post_1.text = 'Измененный текст'
-        post_1.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Измененный текст')
         second_state = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(first_state.content, second_state.content)
         cache.clear()
         third_state = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(second_state.content, third_state.content)
+
+    def test_cache_invalidated_on_changes(self):
+        """Кэш лент сбрасывается при изменении постов и комментариев."""
+        urls = (self.url_index, self.url_group, self.url_profile)
+        for url in urls:
+            self.authorized_client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Измененный текст')
+        Comment.objects.create(post=post, author=self.user, text='Да')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Комментариев: 1')
+        post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Измененный текст')
+
+    def test_follow_cache_invalidated(self):
+        """Кэш ленты подписок сбрасывается при подписке и новом посте."""
+        url = reverse('posts:follow_index')
+        self.client_auth_follower.get(url)
+        Follow.objects.create(user=self.user_follower, author=self.user)
+        response = self.client_auth_follower.get(url)
+        self.assertContains(response, self.post.text)
+        Post.objects.create(author=self.user, text='Свежая запись')
+        response = self.client_auth_follower.get(url)
+        self.assertContains(response, 'Свежая запись')
+
+    def test_fan_out_bumps_follow_feed(self):
+        """Версию ленты подписок меняет раскладка поста, а не чужие посты."""
+        Follow.objects.create(user=self.user_follower, author=self.user)
+        url = reverse('posts:follow_index')
+        etag = self.client_auth_follower.get(url)['ETag']
+        follow_feed = [versions.follow_feed(self.user_follower.pk)]
+        before, _ = versions.get_state(follow_feed)
+        Post.objects.create(author=self.user_follower, text='Своя запись')
+        self.assertEqual(versions.get_state(follow_feed)[0], before)
+        Post.objects.create(author=self.user, text='Свежая запись')
+        self.assertNotEqual(versions.get_state(follow_feed)[0], before)
+        response = self.client_auth_follower.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'Свежая запись')
+
+    def test_follow_feed_revalidates_after_edit(self):
+        """Правка поста из ленты подписок меняет её ETag."""
+        Follow.objects.create(user=self.user_follower, author=self.user)
+        url = reverse('posts:follow_index')
+        etag = self.client_auth_follower.get(url)['ETag']
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.client_auth_follower.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'Исправленный текст')
+
+    def test_group_change_invalidates_old_group(self):
+        """Пост, убранный из группы, пропадает из её закэшированной ленты."""
+        link = f'href="{self.url_post_detail}"'
+        self.assertContains(self.guest_client.get(self.url_group), link)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = None
+        post.save()
+        response = self.guest_client.get(self.url_group)
+        self.assertNotContains(response, link)
+
+    def test_conditional_get(self):
+        """Повторный запрос с If-None-Match получает 304 без рендеринга."""
+        urls = (
+            self.url_index, self.url_group, self.url_profile,
+            self.url_post_detail,
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                self.assertIn('no-cache', response['Cache-Control'])
+                etag = response['ETag']
+                with CaptureQueriesContext(connection) as context:
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertFalse(response.templates)
+                self.assertLessEqual(len(context), 1)
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_new_csrf_token(self):
+        """После смены CSRF-токена страница с формой не отдаётся как 304."""
+        cookies = self.authorized_client.cookies
+        cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        etag = self.authorized_client.get(self.url_post_detail)['ETag']
+        cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        response = self.authorized_client.get(
+            self.url_post_detail, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_conditional_get_after_changes(self):
+        """ETag меняется при изменении поста, комментарии и подписке."""
+        def etag(client, url):
+            return client.get(url)['ETag']
+
+        before = {
+            url: etag(self.authorized_client, url)
+            for url in (self.url_index, self.url_post_detail)
+        }
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        for url, value in before.items():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=value
+                )
+                self.assertEqual(response.status_code, 200)
+        profile = etag(self.client_auth_follower, self.url_profile)
+        self.client_auth_follower.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.user.username}
+        ))
+        response = self.client_auth_follower.get(
+            self.url_profile, HTTP_IF_NONE_MATCH=profile
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+        follow = etag(self.client_auth_follower, reverse('posts:follow_index'))
+        Post.objects.create(author=self.user, text='Свежая запись')
+        response = self.client_auth_follower.get(
+            reverse('posts:follow_index'), HTTP_IF_NONE_MATCH=follow
+        )
+        self.assertContains(response, 'Свежая запись')
+
+    def test_conditional_get_after_rename(self):
+        """ETag поста меняется, когда автор или комментатор сменил имя."""
+        Comment.objects.create(
+            post=self.post, author=self.user_follower, text='Да'
+        )
+        for pk in (self.user.pk, self.user_follower.pk):
+            user = User.objects.get(pk=pk)
+            with self.subTest(user=user.username):
+                etag = self.authorized_client.get(
+                    self.url_post_detail
+                )['ETag']
+                user.username = f'{user.username}_renamed'
+                user.save()
+                response = self.authorized_client.get(
+                    self.url_post_detail, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, user.username)
+
+
+class ReplicaLagTest(LaggingReplicaMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.sync()
+
+    def test_feed_not_rendered_from_stale_replica(self):
+        """Новая версия ленты не собирается из отставшей реплики."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(author=self.author, text='Свежая запись')
+        self.assertContains(self.client.get(url), 'Свежая запись')
+        self.sync()
+        self.assertContains(self.client.get(url), 'Свежая запись')
+
+    def test_version_bumped_again_on_commit(self):
+        """Версия, прочитанная до коммита, после него устаревает."""
+        feeds = [versions.global_feed()]
+        with transaction.atomic():
+            Post.objects.create(author=self.author, text='Запись')
+            during, _ = versions.get_state(feeds)
+        self.assertNotEqual(versions.get_state(feeds)[0], during)
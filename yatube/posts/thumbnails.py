@@ -0,0 +1,90 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+from sorl.thumbnail import get_thumbnail
+
+from core import tasks
+
+from . import versions
+from .models import Post
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def _target_format():
+    if features.check('webp'):
+        return 'WEBP', '.webp'
+    return 'JPEG', '.jpg'
+
+
+def compact(post_id):
+    """
+    Перекодирует загруженную картинку в компактный формат (WebP, если
+    Pillow его поддерживает, иначе JPEG) без метаданных EXIF.
+    """
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    name = post.image.name
+    image_format, extension = _target_format()
+    with post.image.open('rb') as source, Image.open(source) as image:
+        if getattr(image, 'is_animated', False):
+            return
+        image = ImageOps.exif_transpose(image)
+        transparent = 'A' in image.getbands() or 'transparency' in image.info
+        mode = 'RGBA' if transparent and image_format == 'WEBP' else 'RGB'
+        if image.mode != mode:
+            image = image.convert(mode)
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=settings.POST_IMAGE_QUALITY)
+    storage = post.image.storage
+    new_name = storage.save(
+        os.path.splitext(name)[0] + extension, ContentFile(buffer.getvalue())
+    )
+    if Post.objects.filter(pk=post_id, image=name).update(
+        image=new_name, updated=timezone.now()
+    ):
+        storage.delete(name)
+    else:
+        storage.delete(new_name)
+
+
+def generate(post_id):
+    """Строит миниатюру и сохраняет её адрес и размеры в строке поста."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None:
+        return
+    source = post.image.name or ''
+    fields = {
+        'thumbnail': '', 'thumbnail_width': None,
+        'thumbnail_height': None, 'thumbnail_source': source,
+        'updated': timezone.now(),
+    }
+    if source:
+        thumbnail = get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+        fields.update(
+            thumbnail=thumbnail.name,
+            thumbnail_width=thumbnail.width,
+            thumbnail_height=thumbnail.height,
+        )
+    if Post.objects.filter(pk=post_id, image=source).update(**fields):
+        versions.bump_post(post_id)
+
+
+def process(post_id):
+    compact(post_id)
+    generate(post_id)
+
+
+def schedule(post_id):
+    # Картинка обрабатывается только после коммита, даже в режиме
+    # immediate: работа с файлами не должна держать транзакцию записи.
+    transaction.on_commit(lambda: tasks.enqueue(
+        process, post_id, key=f'thumbnails:{post_id}'
+    ))
@@ -0,0 +1,333 @@
+import abc
+import csv
+import itertools
+import json
+import os
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.db import supports_returning, use_primary
+
+from . import counters, feeds, following, search, versions
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+TRANSFER_BATCH = 1000
+
+
+def _ids(model, field, values):
+    """Сопоставление значение -> pk для одной пачки строк."""
+    values = {value for value in values if value}
+    return dict(model.objects.filter(
+        **{f'{field}__in': values}
+    ).values_list(field, 'pk'))
+
+
+def _users(usernames):
+    """pk пользователей пачки; недостающие создаются без пароля."""
+    found = _ids(User, 'username', usernames)
+    missing = set(usernames) - set(found)
+    if missing:
+        User.objects.bulk_create(
+            [User(username=name, password='!') for name in missing],
+            ignore_conflicts=True
+        )
+        created = _ids(User, 'username', missing)
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=pk) for pk in created.values()],
+            ignore_conflicts=True
+        )
+        found.update(created)
+    return found
+
+
+def _date(value):
+    return parse_datetime(value) if isinstance(value, str) else value
+
+
+def insert_rows(model, objects, returning=False):
+    """
+    Вставка пачки одним executemany, без pre_save полей: auto_now_add
+    не перезаписывает даты из файла. Строки с уже существующим ключом
+    пропускаются, поэтому пачку после сбоя можно загрузить повторно.
+
+    С returning возвращает pk реально вставленных строк: запросами с
+    RETURNING по bulk_batch_size строк, а где его нет — запросом на
+    строку с проверкой rowcount (как в posts.follows).
+    """
+    if not objects:
+        return []
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field is not model._meta.pk or objects[0].pk is not None
+    ]
+    ops = connection.ops
+    quote = ops.quote_name
+    row = f'({", ".join(["%s"] * len(fields))})'
+
+    def insert(count):
+        return (
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{quote(model._meta.db_table)} '
+            f'({", ".join(quote(field.column) for field in fields)}) '
+            f'VALUES {", ".join([row] * count)} '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+
+    values = [[
+        field.get_db_prep_save(getattr(obj, field.attname), connection)
+        for field in fields
+    ] for obj in objects]
+    with connection.cursor() as cursor:
+        if not returning:
+            cursor.executemany(insert(1), values)
+            return None
+        inserted = []
+        if supports_returning(connection):
+            size = ops.bulk_batch_size(fields, objects)
+            for start in range(0, len(values), size):
+                batch = values[start:start + size]
+                cursor.execute(
+                    f'{insert(len(batch))} RETURNING '
+                    f'{quote(model._meta.pk.column)}',
+                    list(itertools.chain.from_iterable(batch))
+                )
+                inserted += [pk for pk, in cursor.fetchall()]
+            return inserted
+        for obj, params in zip(objects, values):
+            cursor.execute(insert(1), params)
+            if cursor.rowcount:
+                inserted.append(obj.pk)
+        return inserted
+
+
+def _recount_users(user_ids, *counters_to_fix):
+    UserStats.objects.filter(user_id__in=set(user_ids)).update(**{
+        field: counters.actual_count(related, lookup, outer='user_id')
+        for field, related, lookup in counters.USER_COUNTERS
+        if field in counters_to_fix
+    })
+
+
+class Kind(abc.ABC):
+    """
+    Описание выгружаемой модели: колонки файла, поля для выборки и
+    загрузка пачки. С derived загрузка пачки сразу обновляет счётчики,
+    ленты и поисковый индекс затронутых строк. Версии затронутых лент
+    (posts.versions) меняются всегда.
+    """
+    model = None
+    columns = ()
+    lookups = ()
+
+    @abc.abstractmethod
+    def load(self, rows, derived=True):
+        """Загружает пачку строк файла (словари по columns)."""
+
+
+class GroupKind(Kind):
+    model = Group
+    columns = lookups = ('id', 'title', 'slug', 'description')
+
+    def load(self, rows, derived=True):
+        insert_rows(Group, [Group(
+            id=int(row['id']), title=row['title'], slug=row['slug'],
+            description=row['description'],
+        ) for row in rows])
+        versions.bump([versions.group_feed(row['slug']) for row in rows])
+
+
+class PostKind(Kind):
+    model = Post
+    columns = ('id', 'author', 'group', 'text', 'pub_date', 'image')
+    lookups = (
+        'id', 'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    )
+
+    def load(self, rows, derived=True):
+        authors = _users([row['author'] for row in rows])
+        groups = _ids(Group, 'slug', [row['group'] for row in rows])
+        posts = [Post(
+            id=int(row['id']), author_id=authors[row['author']],
+            group_id=groups.get(row['group']), text=row['text'],
+            pub_date=_date(row['pub_date']), image=row['image'] or '',
+        ) for row in rows]
+        # Пропущенные строки уже в базе: их индекс и ленты не трогаем.
+        inserted = set(insert_rows(Post, posts, returning=True))
+        posts = [post for post in posts if post.pk in inserted]
+        if derived:
+            search.get_backend().index_many(posts)
+            feeds.fan_out_posts([post.pk for post in posts])
+            _recount_users(authors.values(), 'post_count')
+        versions.bump_posts([post.pk for post in posts])
+
+
+class CommentKind(Kind):
+    model = Comment
+    columns = ('id', 'post', 'author', 'text', 'created')
+    lookups = ('id', 'post_id', 'author__username', 'text', 'created')
+
+    def load(self, rows, derived=True):
+        authors = _users([row['author'] for row in rows])
+        comments = [Comment(
+            id=int(row['id']), post_id=int(row['post']),
+            author_id=authors[row['author']], text=row['text'],
+            created=_date(row['created']),
+        ) for row in rows]
+        insert_rows(Comment, comments)
+        if derived:
+            Post.objects.filter(
+                pk__in={comment.post_id for comment in comments}
+            ).update(
+                comment_count=counters.actual_count(Comment, 'post'),
+                updated=timezone.now(),
+            )
+        versions.bump_posts({comment.post_id for comment in comments})
+
+
+class FollowKind(Kind):
+    model = Follow
+    columns = ('user', 'author')
+    lookups = ('user__username', 'author__username')
+
+    def load(self, rows, derived=True):
+        users = _users(
+            [row['user'] for row in rows] + [row['author'] for row in rows]
+        )
+        follows = [
+            Follow(user_id=users[row['user']], author_id=users[row['author']])
+            for row in rows if row['user'] != row['author']
+        ]
+        insert_rows(Follow, follows)
+        user_ids = {follow.user_id for follow in follows}
+        for user_id in user_ids:
+            following.invalidate(user_id)
+        versions.bump(
+            [versions.follow_feed(user_id) for user_id in user_ids]
+            + [versions.following_feed(user_id) for user_id in user_ids]
+        )
+        if not derived:
+            return
+        _recount_users(users.values(), 'follower_count', 'following_count')
+        versions.bump([versions.author_stats(pk) for pk in users.values()])
+        followers = {}
+        for follow in follows:
+            followers.setdefault(follow.author_id, []).append(follow.user_id)
+        for author_id, user_ids in followers.items():
+            if not feeds.is_celebrity(author_id):
+                feeds.backfill(user_ids, author_id)
+
+
+KINDS = {
+    'groups': GroupKind(),
+    'posts': PostKind(),
+    'comments': CommentKind(),
+    'follows': FollowKind(),
+}
+
+
+def file_format(path, explicit=None):
+    if explicit:
+        return explicit
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def export_rows(kind, output, fmt, batch_size=TRANSFER_BATCH):
+    """
+    Пишет все строки модели в поток порциями по первичному ключу,
+    не держа выборку в памяти. Возвращает число строк.
+    """
+    kind = KINDS[kind]
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(kind.columns)
+    total = 0
+    queryset = kind.model.objects.order_by('pk')
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(batch.values_list('pk', *kind.lookups)[:batch_size])
+        if not rows:
+            return total
+        for row in rows:
+            values = [
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in row[1:]
+            ]
+            if writer is not None:
+                writer.writerow(
+                    ['' if value is None else value for value in values]
+                )
+            else:
+                output.write(json.dumps(
+                    dict(zip(kind.columns, values)), ensure_ascii=False
+                ) + '\n')
+        total += len(rows)
+        last = rows[-1][0]
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def checkpoint_path(path):
+    return path + '.checkpoint'
+
+
+def read_checkpoint(path):
+    try:
+        with open(checkpoint_path(path)) as checkpoint:
+            return json.load(checkpoint)['rows']
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def _write_checkpoint(path, rows):
+    temporary = checkpoint_path(path) + '.tmp'
+    with open(temporary, 'w') as checkpoint:
+        json.dump({'rows': rows}, checkpoint)
+    os.replace(temporary, checkpoint_path(path))
+
+
+def import_rows(kind, path, fmt, batch_size=TRANSFER_BATCH, resume=True,
+                derived=True, progress=None):
+    """
+    Загружает файл пачками по batch_size строк, каждая — в своей
+    транзакции. После каждой пачки номер строки пишется в файл
+    <path>.checkpoint, и повторный запуск продолжает с него.
+    Производные данные (счётчики, ленты, поисковый индекс) обновляются
+    в той же транзакции, что и пачка, если derived не выключен.
+    Все чтения идут в основную базу: реплика может ещё не знать о
+    только что созданных пользователях и загруженных строках.
+    """
+    kind = KINDS[kind]
+    done = read_checkpoint(path) if resume else 0
+    skipped = done
+    with use_primary(), open(path, newline='', encoding='utf-8') as stream:
+        rows = itertools.islice(read_rows(stream, fmt), done, None)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                kind.load(batch, derived)
+            done += len(batch)
+            _write_checkpoint(path, done)
+            if progress is not None:
+                progress(done)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [kind.model]
+        ):
+            cursor.execute(sql)
+    if os.path.exists(checkpoint_path(path)):
+        os.remove(checkpoint_path(path))
+    return done - skipped
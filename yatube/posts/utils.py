@@ -1,10 +1,133 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
 COUNT_PAGES = 10
+APPROXIMATE_COUNT_TIMEOUT = 300
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_token(data):
+    raw = json.dumps(data).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Возвращает данные курсора или None, если курсор битый."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, TypeError, ValueError):
+        return None
+
+
+def encode_cursor(direction, post):
+    return encode_token([direction, post.pub_date.isoformat(), post.pk])
+
+
+def decode_cursor(token):
+    """Возвращает (направление, pub_date, id) или None для битого курсора."""
+    try:
+        direction, pub_date, pk = decode_token(token)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def after_cursor(queryset, cursor, pk='pk'):
+    """
+    Записи queryset за курсором в порядке обхода: от новых к старым,
+    а для CURSOR_PREVIOUS — от старых к новым. Условие записано как
+    pub_date <= x AND (pub_date < x OR id < y), чтобы база шла по
+    индексу (..., pub_date, id) диапазоном, а не фильтровала его.
+    """
+    if cursor is None or cursor[0] == CURSOR_NEXT:
+        queryset = queryset.order_by('-pub_date', f'-{pk}')
+        if cursor is None:
+            return queryset
+        _, pub_date, key = cursor
+        return queryset.filter(
+            Q(pub_date__lte=pub_date),
+            Q(pub_date__lt=pub_date) | Q(**{f'{pk}__lt': key}),
+        )
+    _, pub_date, key = cursor
+    return queryset.order_by('pub_date', pk).filter(
+        Q(pub_date__gte=pub_date),
+        Q(pub_date__gt=pub_date) | Q(**{f'{pk}__gt': key}),
+    )
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинация по ключу (pub_date, id) вместо LIMIT/OFFSET.
+
+    Страница выбирается одним запросом с условием по ключу последней
+    показанной записи, поэтому глубокие страницы стоят столько же,
+    сколько первая, а COUNT(*) не выполняется вовсе.
+    Общее число записей доступно приблизительно, через кэш.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, with_total=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.with_total = with_total
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def _window(self, cursor, limit):
+        """
+        До limit записей за курсором в порядке обхода. Источник со
+        своим способом выборки (см. posts.feeds.FollowFeed) задаёт его
+        методом cursor_window.
+        """
+        window = getattr(self.object_list, 'cursor_window', None)
+        if window is not None:
+            return window(cursor, limit)
+        return list(after_cursor(self.object_list, cursor)[:limit])
+
+    def cursor_page(self, token=None):
+        cursor = decode_cursor(token) if token else None
+        posts = self._window(cursor, self.per_page + 1)
+        if cursor is None or cursor[0] == CURSOR_NEXT:
+            has_more = len(posts) > self.per_page
+            posts = posts[:self.per_page]
+            has_before = cursor is not None
+        else:
+            has_before = len(posts) > self.per_page
+            posts = posts[:self.per_page][::-1]
+            has_more = True
+        if posts and has_more:
+            self.next_cursor = encode_cursor(CURSOR_NEXT, posts[-1])
+        if posts and has_before:
+            self.previous_cursor = encode_cursor(CURSOR_PREVIOUS, posts[0])
+        return Page(posts, 1, self)
+
+    @cached_property
+    def approximate_count(self):
+        query = str(self.object_list.query).encode()
+        key = 'paginator_count:' + hashlib.md5(query).hexdigest()
+        return cache.get_or_set(
+            key, lambda: self.count, APPROXIMATE_COUNT_TIMEOUT
+        )
 
 
-def paginator_func(request, objects):
-    paginator = Paginator(objects, COUNT_PAGES)
+def paginator_func(request, objects, with_total=False):
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None:
+        paginator = Paginator(objects, COUNT_PAGES)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(objects, COUNT_PAGES, with_total=with_total)
+    return paginator.cursor_page(request.GET.get('cursor'))
@@ -0,0 +1,147 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.db import use_primary
+
+from .models import FeedEntry, Group, Post
+
+PREFIX = 'feed_version:'
+MODIFIED_PREFIX = 'feed_modified:'
+
+
+def global_feed():
+    return 'global'
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def following_feed(user_id):
+    """Меняется только при подписке и отписке пользователя."""
+    return f'following:{user_id}'
+
+
+def author_stats(user_id):
+    """Счётчики подписчиков и подписок в профиле пользователя."""
+    return f'stats:{user_id}'
+
+
+def _initial():
+    # Версия после вытеснения из кэша должна быть больше любой прежней,
+    # иначе снова станут видны устаревшие фрагменты.
+    return time.time_ns() // 1000
+
+
+def get_state(feeds):
+    """
+    Версии лент и время последнего изменения любой из них (timestamp).
+    Ключи, вытесненные из кэша, создаются заново с текущим временем.
+    """
+    keys = [PREFIX + feed for feed in feeds]
+    keys += [MODIFIED_PREFIX + feed for feed in feeds]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            initial = _initial() if key.startswith(PREFIX) else time.time()
+            cache.add(key, initial, None)
+            found[key] = cache.get(key)
+    state = {feed: found[PREFIX + feed] for feed in feeds}
+    modified = max(found[MODIFIED_PREFIX + feed] for feed in feeds)
+    return state, modified
+
+
+def version_string(state, feeds):
+    """Строка версий лент для ключа фрагментного кэша."""
+    return ';'.join(f'{feed}={state[feed]}' for feed in feeds)
+
+
+def _bump(feeds):
+    for feed in feeds:
+        try:
+            cache.incr(PREFIX + feed)
+        except ValueError:
+            cache.set(PREFIX + feed, _initial(), None)
+    now = time.time()
+    cache.set_many({MODIFIED_PREFIX + feed: now for feed in feeds}, None)
+
+
+def bump(feeds):
+    feeds = list(feeds)
+    _bump(feeds)
+    # Ещё раз после коммита: страница, собранная по новой версии до
+    # коммита или из реплики, скопированной до него, осталась бы в кэше
+    # без этой записи. Время изменения тоже становится не раньше коммита
+    # (см. core.db.read_after).
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(feeds))
+
+
+def _reader_feeds(entries):
+    """Ленты подписок, куда посты попали через FeedEntry."""
+    user_ids = entries.order_by().values_list('user_id', flat=True)
+    return [follow_feed(user_id) for user_id in sorted(set(user_ids))]
+
+
+def post_feeds(post, group_slug=None):
+    """
+    Ленты, где виден пост. Ленты подписок «знаменитостей» меняются
+    через ленту автора (posts.decorators.follow_feeds), остальные
+    находятся по FeedEntry.
+    """
+    feeds = [global_feed(), author_feed(post.author_id), post_feed(post.pk)]
+    if group_slug:
+        feeds.append(group_feed(group_slug))
+    with use_primary():
+        return feeds + _reader_feeds(FeedEntry.objects.filter(post=post))
+
+
+def author_feeds(author_id):
+    """Ленты-списки, где могут быть посты автора."""
+    with use_primary():
+        slugs = list(Group.objects.filter(
+            group_posts__author_id=author_id
+        ).values_list('slug', flat=True).distinct())
+        readers = _reader_feeds(FeedEntry.objects.filter(
+            post__author_id=author_id
+        ))
+    return [global_feed(), author_feed(author_id)] + [
+        group_feed(slug) for slug in slugs
+    ] + readers
+
+
+def bump_posts(post_ids):
+    """Ленты пачки постов: два запроса на пачку."""
+    # Сразу после записи реплика может ещё не знать о постах.
+    with use_primary():
+        posts = list(Post.objects.filter(
+            pk__in=post_ids
+        ).select_related('group'))
+        feeds = {global_feed()} if posts else set()
+        for post in posts:
+            feeds.update([author_feed(post.author_id), post_feed(post.pk)])
+            if post.group:
+                feeds.add(group_feed(post.group.slug))
+        if posts:
+            feeds.update(_reader_feeds(FeedEntry.objects.filter(
+                post_id__in=[post.pk for post in posts]
+            )))
+    bump(sorted(feeds))
+
+
+def bump_post(post_id):
+    bump_posts([post_id])
@@ -1,56 +1,99 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import redirect, render, get_object_or_404
+from . import comment_queue, follows, versions
+from .comments import comment_page
+from .decorators import feed_conditional, follow_feeds, profile_feeds
+from .feeds import follow_feed, followed_celebrities
+from .following import is_following
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from .models import Post, Group, User
+from .search import search_posts
 from .utils import paginator_func
 
 
+@feed_conditional(lambda request: [versions.global_feed()])
 def index(request):
-    posts = Post.objects.select_related('author', 'group')
-    page_obj = paginator_func(request, posts)
+    posts = Post.objects.for_feed()
+    page_obj = paginator_func(request, posts, with_total=True)
     context = {
         'page_obj': page_obj,
+        'feed_version': request.feed_version,
     }
     return render(request, 'posts/index.html', context)
 
 
+@feed_conditional(lambda request, slug: [versions.group_feed(slug)])
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
+    posts = group.group_posts.for_feed()
     page_obj = paginator_func(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_version': request.feed_version,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@feed_conditional(profile_feeds, viewer=True)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.for_feed()
+    following = is_following(request.user, author.pk)
     page_obj = paginator_func(request, posts)
     context = {
         'page_obj': page_obj,
         'author': author,
         'following': following,
+        'feed_version': request.feed_version,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@feed_conditional(
+    lambda request, post_id: [versions.post_feed(post_id)]
+)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
     form = CommentForm(request.POST or None)
+    try:
+        comments, next_cursor = comment_page(
+            post, request.GET.get('comments')
+        )
+    except ValueError:
+        comments, next_cursor = comment_page(post)
+    pending = []
+    if settings.COMMENT_QUEUE and not request.GET.get('comments'):
+        pending = comment_queue.pending_for(post, request.user)
     context = {
         'post': post,
         'form': form,
+        'comments': comments,
+        'comments_cursor': next_cursor,
+        'pending_comments': pending,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = [], None
+    if query:
+        posts, next_cursor = search_posts(query, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None,)
     if not form.is_valid():
@@ -86,10 +129,15 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
-    if form.is_valid():
+    if form.is_valid() and settings.COMMENT_QUEUE:
+        comment_queue.enqueue(
+            post.pk, request.user, form.cleaned_data['text']
+        )
+    elif form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
@@ -98,11 +146,14 @@ def add_comment(request, post_id):
 
 
 @login_required
+@feed_conditional(follow_feeds)
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    celebrities = list(followed_celebrities(request.user))
+    posts = follow_feed(request.user, celebrities)
     page_obj = paginator_func(request, posts)
     context = {
         'page_obj': page_obj,
+        'feed_version': request.feed_version,
     }
     return render(request, 'posts/follow.html', context)
 
@@ -110,22 +161,12 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    check_object = Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists()
-    if request.user != author and not check_object:
-        Follow.objects.create(user=request.user, author=author)
+    follows.follow(request.user, [author.pk])
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    check_object = Follow.objects.filter(
-        user=request.user,
-        author=author
-    )
-    if check_object.exists():
-        check_object.delete()
+    follows.unfollow(request.user, [author.pk])
     return redirect('posts:profile', username=username)
@@ -18,15 +18,35 @@ ALLOWED_HOSTS = [
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 10,
+        },
     }
 }
 
+# С REDIS_URL кэш переезжает в Redis; REDIS_MAXMEMORY (например, 256mb)
+# включает в нём вытеснение allkeys-lru.
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'KEY_PREFIX': 'yatube',
+        'OPTIONS': {
+            'MAXMEMORY': os.environ.get('REDIS_MAXMEMORY'),
+        },
+    }
+
+TEST_RUNNER = 'core.tests.runner.TestRunner'
+
 INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -37,7 +57,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -50,7 +72,7 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,8 +87,22 @@ TEMPLATES = [
     },
 ]
 
+# Пакет исходников шаблонов (manage.py compile_templates) и компиляция
+# всех шаблонов при старте воркера (yatube/wsgi.py).
+TEMPLATE_BUNDLE = os.path.join(BASE_DIR, 'templates.bundle.json')
+TEMPLATE_WARMUP = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Метрики запросов (core.metrics): доля замеряемых запросов, общий для
+# воркеров файл с гистограммами и длина окна для процентилей, секунды.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 0.1))
+METRICS_FILE = os.path.join(BASE_DIR, 'metrics.bin')
+METRICS_WINDOW = 60
+# /metrics открыт staff и запросам с заголовком
+# Authorization: Bearer <METRICS_TOKEN>; без токена — только staff.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 
 DATABASES = {
     'default': {
@@ -75,6 +111,27 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: DB_REPLICAS=2 добавляет файлы
+# db_replica1.sqlite3 и db_replica2.sqlite3, которые команда
+# replicate_sqlite держит в синхронизации с основной базой.
+DATABASE_REPLICAS = []
+for number in range(1, int(os.environ.get('DB_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db_replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+
+# Прагмы, выполняемые при каждом новом соединении с SQLite.
+# Рабочие значения — в yatube/settings_production.py.
+SQLITE_PRAGMAS = {}
+
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = 5
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,5 +172,54 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
+SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+SEARCH_PAGE_SIZE = 10
+
+# Комментарии под постом (posts.comments): размер страницы и сколько
+# секунд живёт в кэше первая страница.
+COMMENTS_PAGE_SIZE = 20
+COMMENTS_CACHE_TIMEOUT = 24 * 3600
+
+# Буферизованный приём комментариев (posts.comment_queue): с
+# COMMENT_QUEUE=1 комментарии копятся в PendingComment и переносятся
+# пачками по COMMENT_QUEUE_BATCH командой flush_comments.
+COMMENT_QUEUE = bool(os.environ.get('COMMENT_QUEUE'))
+COMMENT_QUEUE_BATCH = 500
+
+# JSON API (api): размер страницы по умолчанию и максимальный,
+# сколько постов можно запросить одним ?ids=.
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
+API_BATCH_SIZE = 100
+
+FEED_CELEBRITY_FOLLOWERS = 1000
+# Сколько секунд живёт в кэше список подписок пользователя
+# (posts.following); подписка и отписка сбрасывают его сразу.
+FOLLOWING_CACHE_TIMEOUT = 24 * 3600
+FEED_BACKFILL_POSTS = 200
+# Сколько новейших записей FeedEntry хранится на пользователя
+# (manage.py trim_feeds); старые посты из ленты подписок выпадают.
+FEED_MAX_ENTRIES = 800
+# Сколько секунд готовые карточки постов (posts.rendering) живут в кэше.
+FEED_CARD_TIMEOUT = 7 * 24 * 3600
+
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+POST_IMAGE_MAX_BYTES = 10 * 2 ** 20
+POST_IMAGE_MAX_SIDE = 6000
+POST_IMAGE_QUALITY = 82
+
+# Фоновые задачи (core.tasks): immediate — выполнять сразу в запросе,
+# thread — очередь в базе и пул из TASKS_WORKERS потоков процесса,
+# worker — только очередь, её разбирает manage.py run_tasks. Упавшая
+# задача повторяется до TASKS_MAX_ATTEMPTS раз с паузой от
+# TASKS_RETRY_DELAY секунд; взятая задача считается зависшей через
+# TASKS_LEASE секунд. immediate включают только тесты
+# (core.tests.runner, yatube.settings_test).
+TASKS_MODE = os.environ.get('TASKS_MODE', 'thread')
+TASKS_WORKERS = 2
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_LEASE = 300
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -0,0 +1,51 @@
+"""
+Настройки для работы на одном сервере с SQLite под нагрузкой.
+
+Запуск: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+Каждый процесс держит постоянное соединение (CONN_MAX_AGE), а при
+открытии соединения включаются WAL и прагмы из SQLITE_PRAGMAS, поэтому
+читатели не ждут писателя, а писатели ждут друг друга не дольше
+busy_timeout вместо немедленной ошибки «database is locked»:
+транзакции начинаются с BEGIN IMMEDIATE (core.backends.sqlite3).
+
+Шаблоны разбираются один раз на процесс кэширующим загрузчиком.
+При выкладке manage.py compile_templates проверяет все шаблоны и
+собирает их в TEMPLATE_BUNDLE, а воркер при старте компилирует их
+заранее (TEMPLATE_WARMUP), не дожидаясь первого запроса.
+
+Миниатюры, раскладка постов по лентам и поисковый индекс обновляются
+после ответа пулом фоновых задач (TASKS_MODE=thread) или отдельным
+процессом manage.py run_tasks --interval 1 (TASKS_MODE=worker).
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, TEMPLATES
+
+DEBUG = False
+
+for database in DATABASES.values():
+    database['ENGINE'] = 'core.backends.sqlite3'
+    database['CONN_MAX_AGE'] = 600
+    database.setdefault('OPTIONS', {})['timeout'] = 20
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 2**20,
+    'cache_size': -32 * 2**10,
+    'temp_store': 'MEMORY',
+}
+
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'core.templates.BundleLoader',
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATE_WARMUP = True
+
+TASKS_MODE = os.environ.get('TASKS_MODE', 'thread')
@@ -0,0 +1,10 @@
+"""
+Настройки для pytest (см. pytest.ini). manage.py test выставляет то же
+самое в core.tests.runner.TestRunner.
+
+Фоновые задачи выполняются сразу: тест идёт в транзакции, и задачи,
+отложенные до коммита, не выполнились бы вовсе.
+"""
+from .settings import *  # noqa: F401,F403
+
+TASKS_MODE = 'immediate'